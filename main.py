@@ -1,14 +1,1902 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, filedialog, messagebox, simpledialog
 import cv2
-from PIL import Image, ImageTk, ImageDraw, ImageFont
+from PIL import Image, ImageTk, ImageDraw, ImageFont, ImageColor, GifImagePlugin
 import numpy as np
 import os
 import json
-from datetime import datetime, timedelta
+import hashlib
+import mmap
+from datetime import date, datetime, timedelta
 import threading
+import queue
 import glob
-from collections import defaultdict
+import shutil
+import subprocess
+import tempfile
+import time
+import sys
+import zlib
+import struct
+import multiprocessing
+from collections import OrderedDict
+
+try:
+    import resource  # Per-process memory limits, not available on Windows
+except ImportError:
+    resource = None
+
+try:
+    import fcntl  # File locks on POSIX
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt  # File locks on Windows
+except ImportError:
+    msvcrt = None
+
+PHOTO_EXTENSIONS = ('.jpg', '.webp', '.png')
+
+DEFAULT_PHOTO_ENCODING = {
+    'format': 'jpg',       # jpg, webp or png
+    'quality': 95,         # JPEG/WebP quality (WebP above 100 is lossless)
+    'progressive': False,  # Progressive JPEG
+    'optimize': True,      # Optimized Huffman tables for JPEG
+    'png_compression': 3   # PNG zlib level, always lossless
+}
+
+def list_photo_files(photos_dir):
+    """List all saved face photos regardless of encoding"""
+    photo_files = []
+    for extension in PHOTO_EXTENSIONS:
+        photo_files.extend(glob.glob(os.path.join(photos_dir, f"face_*{extension}")))
+    return photo_files
+
+class PhotoWriter:
+    """Background writer that encodes captured frames and saves them atomically"""
+    def __init__(self, encoding):
+        self.encoding = dict(DEFAULT_PHOTO_ENCODING, **encoding)
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+    
+    @staticmethod
+    def extension_for(encoding):
+        """File extension for an encoding"""
+        extension = f".{encoding['format'].lower()}"
+        return extension if extension in PHOTO_EXTENSIONS else '.jpg'
+    
+    @classmethod
+    def encode_params(cls, encoding):
+        """OpenCV imencode parameters for an encoding"""
+        extension = cls.extension_for(encoding)
+        quality = int(encoding['quality'])
+        if extension == '.webp':
+            return [cv2.IMWRITE_WEBP_QUALITY, quality]
+        if extension == '.png':
+            return [cv2.IMWRITE_PNG_COMPRESSION, int(encoding['png_compression'])]
+        return [cv2.IMWRITE_JPEG_QUALITY, quality,
+                cv2.IMWRITE_JPEG_PROGRESSIVE, int(bool(encoding['progressive'])),
+                cv2.IMWRITE_JPEG_OPTIMIZE, int(bool(encoding['optimize']))]
+    
+    def submit(self, frame, filepath, encoding=None):
+        """Queue a frame to be written to filepath with encoding (the configured one by default)"""
+        # Snapshot the encoding with the job: a profile switch may replace it before the job runs
+        self.jobs.put((frame, filepath, dict(encoding or self.encoding)))
+    
+    def _run(self):
+        """Writer thread loop"""
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    return
+                frame, filepath, encoding = job
+                try:
+                    self.write_atomic(frame, filepath, encoding)
+                    self.results.put((filepath, None))
+                except Exception as e:
+                    self.results.put((filepath, e))
+            finally:
+                self.jobs.task_done()
+    
+    def write_atomic(self, frame, filepath, encoding):
+        """Encode frame and write it via temp file plus rename, so a crash never leaves a truncated photo"""
+        ok, buffer = cv2.imencode(self.extension_for(encoding), frame, self.encode_params(encoding))
+        if not ok:
+            raise IOError(f"Failed to encode {os.path.basename(filepath)}")
+        
+        tmp_path = filepath + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(buffer.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, filepath)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    def close(self):
+        """Finish pending writes and stop the writer thread"""
+        self.jobs.put(None)
+        self.thread.join()
+
+def parse_photo_date(filename):
+    """Extract the capture date from a face_DDMMYYYY_HHMMSS photo filename"""
+    try:
+        date_part = os.path.basename(filename).split('_')[1].split('_')[0]
+        return datetime.strptime(date_part, '%d%m%Y').date()
+    except (IndexError, ValueError):
+        return None
+
+def parse_photo_time(filename):
+    """Extract the capture date and time from a face_DDMMYYYY_HHMMSS photo filename"""
+    try:
+        parts = os.path.splitext(os.path.basename(filename))[0].split('_')
+        return datetime.strptime(f"{parts[1]}_{parts[2]}", '%d%m%Y_%H%M%S')
+    except (IndexError, ValueError):
+        return None
+
+class PhotoStatistics:
+    """Materialized photo statistics, updated per capture/delete and persisted between sessions"""
+    # Journal entries appended before the snapshot is rewritten
+    COMPACT_AFTER = 500
+    
+    def __init__(self, index_file):
+        self.index_file = index_file
+        self.journal_file = index_file + '.log'  # One '+day' / '-day' line per change since the snapshot
+        self.journal_entries = 0
+        self.day_counts = {}  # 'YYYY-MM-DD' -> number of photos that day
+        self.total_photos = 0
+        # Runs of consecutive photo days, by both boundaries
+        self.run_end = {}    # first day of a run -> its last day
+        self.run_start = {}  # last day of a run -> its first day
+        self._longest_streak = 0
+        self._first_day = None
+        self._last_day = None
+        self._longest_dirty = False
+        self._bounds_dirty = False
+    
+    def load(self, photo_files):
+        """Load persisted statistics, rebuilding them if they no longer match the photos on disk"""
+        try:
+            with open(self.index_file, 'r') as f:
+                data = json.load(f)
+            total_photos = data['total_photos']
+            day_counts = {k: int(v) for k, v in data.get('day_counts', {}).items()}
+            
+            if os.path.exists(self.journal_file):
+                with open(self.journal_file, 'r') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        key = line[1:]
+                        if line[0] == '+':
+                            total_photos += 1
+                            if key:
+                                day_counts[key] = day_counts.get(key, 0) + 1
+                        else:
+                            total_photos = max(0, total_photos - 1)
+                            if day_counts.get(key, 0) > 1:
+                                day_counts[key] -= 1
+                            else:
+                                day_counts.pop(key, None)
+            
+            if total_photos == len(photo_files):
+                self.total_photos = total_photos
+                self.day_counts = day_counts
+                self._recompute()
+                self.save()
+                return
+        except (OSError, ValueError, KeyError, TypeError, IndexError):
+            pass
+        self.rebuild(photo_files)
+    
+    def rebuild(self, photo_files):
+        """Rebuild statistics from a full list of photo files"""
+        self.day_counts = {}
+        self.total_photos = len(photo_files)
+        for photo_file in photo_files:
+            day = parse_photo_date(photo_file)
+            if day:
+                key = day.isoformat()
+                self.day_counts[key] = self.day_counts.get(key, 0) + 1
+        self._recompute()
+        self.save()
+    
+    def save(self):
+        """Persist a full snapshot atomically and clear the journal"""
+        data = {'total_photos': self.total_photos, 'day_counts': self.day_counts}
+        tmp_file = self.index_file + '.tmp'
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_file, self.index_file)
+            if os.path.exists(self.journal_file):
+                os.remove(self.journal_file)
+            self.journal_entries = 0
+        except OSError:
+            pass
+    
+    def _journal(self, entry):
+        """Persist one change by appending to the journal, compacting it into the snapshot now and then"""
+        if self.journal_entries >= self.COMPACT_AFTER:
+            self.save()
+            return
+        try:
+            with open(self.journal_file, 'a') as f:
+                f.write(entry + '\n')
+            self.journal_entries += 1
+        except OSError:
+            pass
+    
+    def add(self, filename):
+        """Account for a newly captured photo"""
+        self.total_photos += 1
+        day = parse_photo_date(filename)
+        key = day.isoformat() if day else ''
+        if day:
+            count = self.day_counts.get(key, 0)
+            self.day_counts[key] = count + 1
+            if count == 0:
+                self._add_day(day)
+        self._journal('+' + key)
+    
+    def remove(self, filename):
+        """Account for a deleted photo"""
+        self.total_photos = max(0, self.total_photos - 1)
+        day = parse_photo_date(filename)
+        key = day.isoformat() if day else ''
+        if day:
+            count = self.day_counts.get(key, 0)
+            if count > 1:
+                self.day_counts[key] = count - 1
+            elif count == 1:
+                self._remove_day(day)
+        self._journal('-' + key)
+    
+    def _add_day(self, day):
+        """Join day to the runs ending the day before and starting the day after, O(1)"""
+        start = self.run_start.pop(day - timedelta(days=1), day)
+        end = self.run_end.pop(day + timedelta(days=1), day)
+        self.run_end[start] = end
+        self.run_start[end] = start
+        if not self._bounds_dirty:
+            if self._first_day is None or day < self._first_day:
+                self._first_day = day
+            if self._last_day is None or day > self._last_day:
+                self._last_day = day
+        if not self._longest_dirty:
+            self._longest_streak = max(self._longest_streak, (end - start).days + 1)
+    
+    def _remove_day(self, day):
+        """Split the run holding day; O(1) at a run boundary, otherwise a walk to the run's last day"""
+        end = day
+        while end not in self.run_start:
+            end += timedelta(days=1)
+        start = self.run_start.pop(end)
+        del self.run_end[start]
+        if start < day:
+            self.run_end[start] = day - timedelta(days=1)
+            self.run_start[day - timedelta(days=1)] = start
+        if day < end:
+            self.run_end[day + timedelta(days=1)] = end
+            self.run_start[end] = day + timedelta(days=1)
+        
+        if (end - start).days + 1 >= self._longest_streak:
+            self._longest_dirty = True
+        if day == self._first_day or day == self._last_day:
+            self._bounds_dirty = True
+        del self.day_counts[day.isoformat()]
+    
+    def _recompute(self):
+        """Recompute runs and derived aggregates from per-day counts"""
+        days = sorted(date.fromisoformat(key) for key in self.day_counts)
+        self.run_end = {}
+        self.run_start = {}
+        start = previous = None
+        for day in days:
+            if previous is None or (day - previous).days > 1:
+                if previous is not None:
+                    self.run_end[start] = previous
+                    self.run_start[previous] = start
+                start = day
+            previous = day
+        if previous is not None:
+            self.run_end[start] = previous
+            self.run_start[previous] = start
+    
+        self._first_day = days[0] if days else None
+        self._last_day = days[-1] if days else None
+        self._bounds_dirty = False
+        self._refresh_longest()
+    
+    def _refresh_longest(self):
+        """Longest run, from the run boundaries rather than every day"""
+        self._longest_streak = max(((end - start).days + 1 for start, end in self.run_end.items()), default=0)
+        self._longest_dirty = False
+    
+    @property
+    def unique_dates(self):
+        return len(self.day_counts)
+    
+    def _refresh_bounds(self):
+        self._first_day = min(self.run_end, default=None)
+        self._last_day = max(self.run_start, default=None)
+        self._bounds_dirty = False
+    
+    @property
+    def first_day(self):
+        if self._bounds_dirty:
+            self._refresh_bounds()
+        return self._first_day
+    
+    @property
+    def last_day(self):
+        if self._bounds_dirty:
+            self._refresh_bounds()
+        return self._last_day
+    
+    @property
+    def longest_streak(self):
+        if self._longest_dirty:
+            self._refresh_longest()
+        return self._longest_streak
+    
+    @property
+    def current_streak(self):
+        """Consecutive days up to today (or yesterday, if today's photo is still pending)"""
+        today = date.today()
+        for day in (today, today - timedelta(days=1)):
+            start = self.run_start.get(day)
+            if start is not None:
+                return (day - start).days + 1
+        return 0
+    
+    @property
+    def gap_count(self):
+        return max(0, len(self.run_end) - 1)
+    
+    @property
+    def missed_days(self):
+        if not self.day_counts:
+            return 0
+        return (self.last_day - self.first_day).days + 1 - self.unique_dates
+    
+    def gaps(self):
+        """Return (first_missed_day, last_missed_day) for every gap between photo days"""
+        days = sorted(date.fromisoformat(key) for key in self.day_counts)
+        return [(previous + timedelta(days=1), day - timedelta(days=1))
+                for previous, day in zip(days, days[1:]) if (day - previous).days > 1]
+    
+    def heatmap(self):
+        """Calendar heatmap data: list of Monday-first weeks, each 7 (date, count) cells"""
+        if not self.day_counts:
+            return []
+        day = self.first_day - timedelta(days=self.first_day.weekday())
+        weeks = []
+        while day <= self.last_day:
+            week = []
+            for _ in range(7):
+                week.append((day, self.day_counts.get(day.isoformat(), 0)))
+                day += timedelta(days=1)
+            weeks.append(week)
+        return weeks
+
+def jpeg_dimensions(buffer):
+    """Read (width, height) from a JPEG frame header without decoding, None if not found"""
+    data = memoryview(buffer)
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+    
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # Fill byte
+            i += 1
+            continue
+        length = (data[i + 2] << 8) | data[i + 3]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = (data[i + 5] << 8) | data[i + 6]
+            width = (data[i + 7] << 8) | data[i + 8]
+            return width, height
+        i += 2 + length
+    return None
+
+class PhotoStore:
+    """Photo storage over loose files plus append-only packs of older photos"""
+    PACK_MAX_BYTES = 256 * 1024 * 1024
+    
+    def __init__(self, photos_dir):
+        self.photos_dir = photos_dir
+        self.pack_dir = os.path.join(photos_dir, "packs")
+        self.index_file = os.path.join(self.pack_dir, "pack_index.json")
+        self.index = {}  # photo name -> [pack name, offset, length]
+        self.lock = threading.Lock()
+        self.load_index()
+    
+    def load_index(self):
+        """Load the pack offset index"""
+        try:
+            with open(self.index_file, 'r') as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+    
+    def save_index(self):
+        """Persist the pack offset index atomically"""
+        tmp_file = self.index_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(self.index, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.index_file)
+    
+    def list_photos(self):
+        """Names of all photos, loose or packed"""
+        names = {os.path.basename(photo_file) for photo_file in list_photo_files(self.photos_dir)}
+        with self.lock:
+            names.update(self.index)
+        return sorted(names)
+    
+    def loose_path(self, name):
+        return os.path.join(self.photos_dir, name)
+    
+    def exists(self, name):
+        with self.lock:
+            if name in self.index:
+                return True
+        return os.path.exists(self.loose_path(name))
+    
+    def photo_key(self, name):
+        """Identity of the stored bytes of a photo, for caching derived data"""
+        with self.lock:
+            entry = self.index.get(name)
+        if entry and not os.path.exists(self.loose_path(name)):
+            return f"{name}@{entry[0]}:{entry[1]}"
+        stat = os.stat(self.loose_path(name))
+        return f"{name}@{stat.st_size}:{stat.st_mtime_ns}"
+    
+    def _map_range(self, pack_name, offset, length):
+        """Map just the pages of pack_name holding offset..offset+length, returns (mmap, offset within it)"""
+        start = offset - offset % mmap.ALLOCATIONGRANULARITY
+        with open(os.path.join(self.pack_dir, pack_name), 'rb') as f:
+            pack_map = mmap.mmap(f.fileno(), offset + length - start, offset=start, access=mmap.ACCESS_READ)
+        return pack_map, offset - start
+    
+    def read_buffer(self, name):
+        """Encoded bytes of a photo; packed photos are a zero-copy view into the pack mmap"""
+        loose_path = self.loose_path(name)
+        if os.path.exists(loose_path):
+            return np.fromfile(loose_path, dtype=np.uint8)
+        
+        with self.lock:
+            entry = self.index.get(name)
+            if entry is None:
+                raise FileNotFoundError(f"Photo {name} not found")
+            pack_name, offset, length = entry
+        # The mapping lives only as long as the returned buffer, so address space use is
+        # bounded by photos in flight rather than by the size of the archive
+        pack_map, map_offset = self._map_range(pack_name, offset, length)
+        return np.frombuffer(pack_map, dtype=np.uint8, count=length, offset=map_offset)
+    
+    @staticmethod
+    def _decode(name, buffer, flags):
+        """Decode an encoded photo, raising IOError for anything unreadable"""
+        # Empty files are left behind by interrupted writes of older versions; imdecode raises on them
+        if buffer.size == 0:
+            raise IOError(f"Photo {name} is empty")
+        try:
+            img = cv2.imdecode(buffer, flags)
+        except cv2.error as e:
+            raise IOError(f"Failed to decode {name}: {e}")
+        if img is None:
+            raise IOError(f"Failed to decode {name}")
+        return img
+    
+    def read_image(self, name, flags=cv2.IMREAD_COLOR):
+        """Decode a photo to a BGR array"""
+        return self._decode(name, self.read_buffer(name), flags)
+    
+    def read_thumbnail(self, name, max_width, max_height):
+        """Decode a photo at reduced scale and fit it within max_width x max_height"""
+        buffer = self.read_buffer(name)
+        
+        # Let the JPEG decoder skip detail we would throw away anyway
+        flags = cv2.IMREAD_COLOR
+        dimensions = jpeg_dimensions(buffer)
+        if dimensions:
+            ratio = min(max_width / dimensions[0], max_height / dimensions[1])
+            for scale, reduced_flag in ((8, cv2.IMREAD_REDUCED_COLOR_8),
+                                        (4, cv2.IMREAD_REDUCED_COLOR_4),
+                                        (2, cv2.IMREAD_REDUCED_COLOR_2)):
+                if scale * ratio <= 1:
+                    flags = reduced_flag
+                    break
+        
+        img = self._decode(name, buffer, flags)
+        
+        img_height, img_width = img.shape[:2]
+        ratio = min(max_width / img_width, max_height / img_height)
+        new_size = (max(1, int(img_width * ratio)), max(1, int(img_height * ratio)))
+        return cv2.resize(img, new_size, interpolation=cv2.INTER_AREA)
+    
+    def delete(self, name):
+        """Delete a photo; packed bytes are dropped from the index and left in the append-only pack"""
+        deleted = False
+        loose_path = self.loose_path(name)
+        if os.path.exists(loose_path):
+            os.remove(loose_path)
+            deleted = True
+        
+        with self.lock:
+            if name in self.index:
+                del self.index[name]
+                self.save_index()
+                deleted = True
+        return deleted
+    
+    def _current_pack(self):
+        """Name of the pack new photos are appended to"""
+        os.makedirs(self.pack_dir, exist_ok=True)
+        packs = sorted(f for f in os.listdir(self.pack_dir) if f.endswith('.pack'))
+        if packs and os.path.getsize(os.path.join(self.pack_dir, packs[-1])) < self.PACK_MAX_BYTES:
+            return packs[-1]
+        return f"photos_{len(packs) + 1:04d}.pack"
+    
+    def pack_photos(self, older_than_days):
+        """Move loose photos older than older_than_days into packs, returns number of photos packed"""
+        cutoff = date.today() - timedelta(days=older_than_days)
+        candidates = []
+        for photo_file in sorted(list_photo_files(self.photos_dir)):
+            photo_date = parse_photo_date(photo_file)
+            if photo_date and photo_date < cutoff:
+                candidates.append(os.path.basename(photo_file))
+        
+        if not candidates:
+            return 0
+        
+        with self.lock:
+            pack_name = self._current_pack()
+            pack_path = os.path.join(self.pack_dir, pack_name)
+            
+            # Append photo bytes first; the index only references them once they are durable.
+            # A loose file for an already packed name is the current copy (see read_buffer),
+            # so it is appended too and replaces the old entry; the old bytes stay in the pack.
+            new_entries = {}
+            with open(pack_path, 'ab') as pack:
+                offset = pack.tell()
+                for name in candidates:
+                    with open(self.loose_path(name), 'rb') as f:
+                        data = f.read()
+                    pack.write(data)
+                    new_entries[name] = [pack_name, offset, len(data)]
+                    offset += len(data)
+                pack.flush()
+                os.fsync(pack.fileno())
+            
+            self.index.update(new_entries)
+            self.save_index()
+        
+        for name in new_entries:
+            os.remove(self.loose_path(name))
+        return len(new_entries)
+
+def try_lock_file(path):
+    """Take an exclusive lock on path without waiting, returns the open lock file or None if held elsewhere"""
+    lock_file = open(path, 'a+b')
+    try:
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        elif msvcrt:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+def unlock_file(lock_file):
+    """Release a lock taken by try_lock_file"""
+    if msvcrt and not fcntl:
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+    lock_file.close()
+
+def fit_frame(img, width, height):
+    """Resize img to fit width x height, letterboxing to keep its aspect ratio"""
+    img_height, img_width = img.shape[:2]
+    if (img_width, img_height) == (width, height):
+        return img
+    
+    ratio = min(width / img_width, height / img_height)
+    new_width = max(1, int(round(img_width * ratio)))
+    new_height = max(1, int(round(img_height * ratio)))
+    interpolation = cv2.INTER_AREA if ratio < 1 else cv2.INTER_LINEAR
+    resized = cv2.resize(img, (new_width, new_height), interpolation=interpolation)
+    
+    if (new_width, new_height) == (width, height):
+        return resized
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    x = (width - new_width) // 2
+    y = (height - new_height) // 2
+    frame[y:y + new_height, x:x + new_width] = resized
+    return frame
+
+class FrameCache:
+    """Memory-mapped LRU cache of decoded frames already processed for given render settings"""
+    GROW_FRAMES = 64
+    
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.buckets = {}  # settings hash -> open memmap bucket
+        # (settings hash, photo key) used by the current render. These are never evicted for it:
+        # a render larger than the budget keeps the frames it cached first, rather than
+        # cycling through every slot and finding none of them on the next run.
+        self.render_keys = set()
+        self.lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+    
+    @staticmethod
+    def settings_hash(settings):
+        """Stable hash of the processing settings a frame was produced with"""
+        return hashlib.sha1(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:16]
+    
+    def _bucket_paths(self, bucket_hash):
+        base = os.path.join(self.cache_dir, bucket_hash)
+        return base + '.frames', base + '.json'
+    
+    def _lock_path(self, bucket_hash):
+        return os.path.join(self.cache_dir, bucket_hash + '.lock')
+    
+    def _open_bucket(self, settings):
+        """Open (or create) the memmap holding frames for settings"""
+        bucket_hash = self.settings_hash(settings)
+        bucket = self.buckets.get(bucket_hash)
+        if bucket:
+            return bucket
+        
+        frames_path, index_path = self._bucket_paths(bucket_hash)
+        shape = (settings['height'], settings['width'], 3)
+        slots = OrderedDict()  # photo key -> slot, least recently used first
+        
+        # Another process (a batch render, or a second app window) may be using this bucket.
+        # Rather than wait, frames are then produced uncached until the next flush.
+        lock_file = try_lock_file(self._lock_path(bucket_hash))
+        bucket = {'hash': bucket_hash, 'shape': shape, 'slots': slots, 'capacity': 0, 'frames': None,
+                  'lock': lock_file, 'bypass': lock_file is None}
+        self.buckets[bucket_hash] = bucket
+        if bucket['bypass']:
+            return bucket
+        
+        try:
+            with open(index_path, 'r') as f:
+                slots.update(json.load(f)['slots'])
+            # The index is only valid until frames change, it is rewritten on flush
+            os.remove(index_path)
+        except (OSError, ValueError, KeyError):
+            pass
+        
+        try:
+            capacity = os.path.getsize(frames_path) // int(np.prod(shape)) if os.path.exists(frames_path) else 0
+            if capacity * int(np.prod(shape)) > self.max_bytes:
+                # Left over from a larger budget, start the bucket over
+                os.remove(frames_path)
+                capacity = 0
+            if capacity:
+                bucket['frames'] = np.memmap(frames_path, dtype=np.uint8, mode='r+', shape=(capacity,) + shape)
+                bucket['capacity'] = capacity
+            else:
+                slots.clear()
+        except (OSError, MemoryError):
+            self._disable_bucket(bucket)
+        return bucket
+    
+    def _disable_bucket(self, bucket):
+        """Stop caching in a bucket that failed to map or grow, e.g. with the disk or address space full"""
+        bucket['frames'] = None
+        bucket['slots'].clear()
+        bucket['capacity'] = 0
+        bucket['bypass'] = True
+    
+    def _grow_bucket(self, bucket):
+        """Extend a bucket file by up to GROW_FRAMES slots, within the size budget"""
+        frame_bytes = int(np.prod(bucket['shape']))
+        other_bytes = self._evict_buckets(bucket['hash'], (bucket['capacity'] + self.GROW_FRAMES) * frame_bytes)
+        max_frames = (self.max_bytes - other_bytes) // frame_bytes
+        capacity = min(bucket['capacity'] + self.GROW_FRAMES, max_frames)
+        if capacity <= bucket['capacity']:
+            return False
+        
+        frames_path = self._bucket_paths(bucket['hash'])[0]
+        if bucket['frames'] is not None:
+            bucket['frames'].flush()
+            bucket['frames'] = None  # Release the old mapping before resizing the file
+        with open(frames_path, 'ab') as f:
+            f.truncate(capacity * frame_bytes)
+        bucket['frames'] = np.memmap(frames_path, dtype=np.uint8, mode='r+', shape=(capacity,) + bucket['shape'])
+        bucket['capacity'] = capacity
+        return True
+    
+    def _evict_buckets(self, grow_hash, needed_bytes):
+        """Delete least recently used idle buckets until needed_bytes fit, returns bytes used by other buckets"""
+        entries = []
+        total = 0
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith('.frames'):
+                bucket_hash = filename[:-len('.frames')]
+                if bucket_hash == grow_hash:
+                    continue
+                path = os.path.join(self.cache_dir, filename)
+                size = os.path.getsize(path)
+                total += size
+                # Buckets in use by the current render are never evicted
+                if bucket_hash not in self.buckets:
+                    entries.append((os.path.getmtime(path), bucket_hash, size))
+        
+        for _, bucket_hash, size in sorted(entries):
+            if total + needed_bytes <= self.max_bytes:
+                break
+            # Buckets open in another process are not evicted either
+            lock_file = try_lock_file(self._lock_path(bucket_hash))
+            if lock_file is None:
+                continue
+            for path in self._bucket_paths(bucket_hash):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            unlock_file(lock_file)
+            total -= size
+        return total
+    
+    def begin_render(self):
+        """Start a new render; frames used by earlier renders become evictable again"""
+        with self.lock:
+            self.render_keys.clear()
+    
+    def contains(self, photo_key, settings):
+        """Whether a processed frame for photo_key and settings is cached"""
+        with self.lock:
+            return photo_key in self._open_bucket(settings)['slots']
+    
+    def get(self, photo_key, settings, produce):
+        """Return the processed frame for photo_key, calling produce() to build it on a miss"""
+        with self.lock:
+            bucket = self._open_bucket(settings)
+            slot = bucket['slots'].get(photo_key)
+            if slot is not None:
+                bucket['slots'].move_to_end(photo_key)
+                self.render_keys.add((bucket['hash'], photo_key))
+                return np.array(bucket['frames'][slot])
+        
+        frame = produce()
+        if frame.shape != bucket['shape']:
+            return frame
+        
+        with self.lock:
+            slots = bucket['slots']
+            if bucket['bypass'] or photo_key in slots:
+                return frame
+            try:
+                if len(slots) < bucket['capacity'] or self._grow_bucket(bucket):
+                    slot = len(slots)
+                elif slots and (bucket['hash'], next(iter(slots))) not in self.render_keys:
+                    # Frames of the current render are the most recently used, so if the least
+                    # recently used one belongs to it the whole bucket does
+                    _, slot = slots.popitem(last=False)
+                else:
+                    return frame
+                bucket['frames'][slot] = frame
+            except (OSError, MemoryError):
+                # A cache failure never costs the frame itself
+                self._disable_bucket(bucket)
+                return frame
+            slots[photo_key] = slot
+            self.render_keys.add((bucket['hash'], photo_key))
+        return frame
+    
+    def flush(self):
+        """Write frames and LRU indexes to disk"""
+        with self.lock:
+            for bucket in self.buckets.values():
+                if bucket['frames'] is not None:
+                    bucket['frames'].flush()
+                    index_path = self._bucket_paths(bucket['hash'])[1]
+                    with open(index_path, 'w') as f:
+                        json.dump({'slots': list(bucket['slots'].items())}, f)
+                    # Keep bucket recency for eviction in step with use
+                    os.utime(self._bucket_paths(bucket['hash'])[0])
+                    bucket['frames'] = None
+                if bucket['lock'] is not None:
+                    unlock_file(bucket['lock'])
+            # Closed buckets become candidates for eviction by later renders
+            self.buckets.clear()
+
+VIDEO_QUALITY_SETTINGS = {
+    "Low": {"width": 640, "height": 480, "bitrate": "500k"},
+    "Medium": {"width": 1280, "height": 720, "bitrate": "2000k"},
+    "High": {"width": 1920, "height": 1080, "bitrate": "5000k"}
+}
+
+# Extra outputs that can be produced alongside the main video from the same decode pass
+EXPORT_TARGETS = {
+    "1080p MP4": {"kind": "video", "width": 1920, "height": 1080, "suffix": "_1080p.mp4"},
+    "720p MP4": {"kind": "video", "width": 1280, "height": 720, "suffix": "_720p.mp4"},
+    "Preview MP4": {"kind": "video", "width": 640, "height": 360, "suffix": "_preview.mp4",
+                    "reduced_decode": True},
+    "Poster Frame": {"kind": "poster", "width": 1920, "height": 1080, "suffix": "_poster.jpg"},
+    "Animated GIF": {"kind": "animated", "format": "gif", "width": 480, "height": 270, "suffix": "_clip.gif",
+                     "reduced_decode": True, "palette_segment": 0},
+    "Animated WebP": {"kind": "animated", "format": "webp", "width": 640, "height": 360, "suffix": "_clip.webp",
+                      "reduced_decode": True, "palette_segment": 0}
+}
+
+# Photos sampled for each animated export palette
+PALETTE_SAMPLES = 32
+
+# Photos per checkpointed render segment
+SEGMENT_FRAMES = 250
+
+class VideoTargetWriter:
+    """MP4 output for the render pipeline, written as one part per render segment"""
+    def __init__(self, target, fps, part_path, first_index):
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        self.out = cv2.VideoWriter(part_path, fourcc, fps, (target["width"], target["height"]))
+        if not self.out.isOpened():
+            raise IOError(f"Failed to open video writer for {target['path']}")
+    
+    def write(self, frame):
+        self.out.write(frame)
+    
+    def close(self):
+        self.out.release()
+    
+    @staticmethod
+    def join(target, fps, part_paths):
+        """Concatenate segment parts into the target video"""
+        part_paths = [part_path for part_path in part_paths if os.path.exists(part_path)]
+        if not part_paths:
+            if os.path.exists(target["path"]):
+                return  # Single part already moved into place before an interruption
+            raise IOError(f"No frames were rendered for {target['path']}")
+        if len(part_paths) == 1:
+            os.replace(part_paths[0], target["path"])
+            return
+        
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg:
+            # Stream copy, no re-encode
+            list_path = part_paths[0] + '.txt'
+            with open(list_path, 'w') as f:
+                for part_path in part_paths:
+                    f.write(f"file '{os.path.abspath(part_path)}'\n")
+            subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+                            '-i', list_path, '-c', 'copy', target["path"]], check=True)
+            return
+        
+        # Without ffmpeg renders are a single segment (see TimelapseRenderer.segment_frames), this
+        # only joins parts checkpointed while ffmpeg was available: re-encode their frames
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        out = cv2.VideoWriter(target["path"], fourcc, fps, (target["width"], target["height"]))
+        try:
+            for part_path in part_paths:
+                part = cv2.VideoCapture(part_path)
+                while True:
+                    ret, frame = part.read()
+                    if not ret:
+                        break
+                    out.write(frame)
+                part.release()
+        finally:
+            out.release()
+
+class PosterTargetWriter:
+    """Still poster output, saved from the last (most recent) frame"""
+    def __init__(self, target, fps, part_path, first_index):
+        self.part_path = part_path
+        self.last_frame = None
+    
+    def write(self, frame):
+        self.last_frame = frame
+    
+    def close(self):
+        if self.last_frame is not None:
+            cv2.imwrite(self.part_path, self.last_frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
+    
+    @staticmethod
+    def join(target, fps, part_paths):
+        """Keep the poster from the last segment that produced one"""
+        part_paths = [part_path for part_path in part_paths if os.path.exists(part_path)]
+        if part_paths:
+            shutil.move(part_paths[-1], target["path"])
+
+def build_palette(thumbnails, colors=255):
+    """Quantize a montage of sample thumbnails (BGR) into a shared palette image"""
+    width = max(thumbnail.shape[1] for thumbnail in thumbnails)
+    montage = np.zeros((sum(thumbnail.shape[0] for thumbnail in thumbnails), width, 3), dtype=np.uint8)
+    y = 0
+    for thumbnail in thumbnails:
+        montage[y:y + thumbnail.shape[0], :thumbnail.shape[1]] = thumbnail
+        y += thumbnail.shape[0]
+    return Image.fromarray(cv2.cvtColor(montage, cv2.COLOR_BGR2RGB)).quantize(
+        colors=colors, method=Image.Quantize.MEDIANCUT)
+
+def palette_at(palettes, frame_index):
+    """Palette segment (first frame index, palette image) covering a frame"""
+    segment = palettes[0]
+    for start, palette in palettes:
+        if start > frame_index:
+            break
+        segment = (start, palette)
+    return segment
+
+def full_palette(palette):
+    """Palette padded to 256 RGB entries"""
+    entries = palette.getpalette()[:255 * 3]
+    return entries + [0] * (768 - len(entries))
+
+class AnimatedTargetWriter:
+    """Animated GIF/WebP output, quantized against palettes computed once before rendering"""
+    TRANSPARENT_INDEX = 255  # Palettes hold at most 255 colors, leaving this index free
+    
+    def __init__(self, target, fps, part_path, first_index):
+        self.format = target["format"]
+        self.palettes = target["palettes"]  # [(first frame index, palette image)]
+        self.duration = int(round(1000 / fps))
+        self.frame_index = first_index
+        self.previous = None
+        # GIF parts hold encoded frame blocks; WebP needs every frame at assembly,
+        # so its parts spill quantized frames to disk instead of memory
+        self.fp = open(part_path, 'wb')
+    
+    def write(self, frame):
+        start, palette = palette_at(self.palettes, self.frame_index)
+        rgb = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        indices = np.asarray(rgb.quantize(palette=palette, dither=Image.Dither.NONE))
+        
+        if self.format == "gif":
+            self._write_gif_frame(indices, palette, new_segment=self.frame_index == start)
+        else:
+            self.fp.write(indices.tobytes())
+        self.frame_index += 1
+    
+    def _write_gif_frame(self, indices, palette, new_segment):
+        """Append one GIF frame, cropped to the region that changed since the previous frame"""
+        params = {'duration': self.duration, 'disposal': 1}
+        if new_segment or self.previous is None:
+            # Palette changed (or first frame of the part), indices are not comparable with the previous frame
+            x, y, region = 0, 0, indices
+        else:
+            changed = indices != self.previous
+            if changed.any():
+                rows = np.flatnonzero(changed.any(axis=1))
+                cols = np.flatnonzero(changed.any(axis=0))
+                y, x = rows[0], cols[0]
+                region = indices[y:rows[-1] + 1, x:cols[-1] + 1].copy()
+                region[~changed[y:rows[-1] + 1, x:cols[-1] + 1]] = self.TRANSPARENT_INDEX
+            else:
+                x, y, region = 0, 0, np.full((1, 1), self.TRANSPARENT_INDEX, dtype=np.uint8)
+            params['transparency'] = self.TRANSPARENT_INDEX
+        
+        frame_image = Image.frombytes('P', (region.shape[1], region.shape[0]), region.tobytes())
+        frame_image.putpalette(full_palette(palette))
+        if self.palettes[0][1] is not palette:
+            params['include_color_table'] = True
+        for block in GifImagePlugin.getdata(frame_image, offset=(int(x), int(y)), **params):
+            self.fp.write(block)
+        self.previous = indices
+    
+    def close(self):
+        self.fp.close()
+    
+    @staticmethod
+    def join(target, fps, part_paths):
+        """Assemble the animation from its segment parts"""
+        width, height = target["width"], target["height"]
+        palettes = target["palettes"]
+        
+        if target["format"] == "gif":
+            header_image = Image.new('P', (width, height))
+            header_image.putpalette(full_palette(palettes[0][1]))
+            header, _ = GifImagePlugin.getheader(header_image, info={'loop': 0, 'duration': int(round(1000 / fps))})
+            with open(target["path"], 'wb') as f:
+                for block in header:
+                    f.write(block)
+                for part_path in part_paths:
+                    with open(part_path, 'rb') as part:
+                        shutil.copyfileobj(part, f)
+                f.write(b";")  # GIF trailer
+            return
+        
+        frame_bytes = width * height
+        parts = [np.memmap(part_path, dtype=np.uint8, mode='r', shape=(os.path.getsize(part_path) // frame_bytes, height, width))
+                 for part_path in part_paths if os.path.getsize(part_path) >= frame_bytes]
+        frames = []
+        for part in parts:
+            for spilled in part:
+                # Zero-copy views of the spill files, pages are loaded as the encoder walks them
+                frame_image = Image.frombuffer('P', (width, height), spilled, 'raw', 'P', 0, 1)
+                frame_image.putpalette(full_palette(palette_at(palettes, len(frames))[1]))
+                frames.append(frame_image)
+        if frames:
+            frames[0].save(target["path"], format='WEBP', save_all=True, append_images=frames[1:],
+                           duration=int(round(1000 / fps)), loop=0, quality=80, minimize_size=True)
+
+TARGET_WRITERS = {
+    "video": VideoTargetWriter,
+    "poster": PosterTargetWriter,
+    "animated": AnimatedTargetWriter
+}
+
+DEFAULT_OVERLAYS = {
+    'date': True,          # Capture date
+    'day_counter': False,  # "Day N" since the first photo in the range
+    'custom_text': '',     # Free text
+    'date_position': 'bottom_right',
+    'day_counter_position': 'bottom_left',
+    'custom_text_position': 'top_left',
+    'font_path': None,     # TrueType font, falls back to a system or built-in font
+    'text_scale': 1.0,     # Text height as a multiple of 1/24 of the frame height
+    'text_color': '#ffffff',
+    'box_color': '#000000a0',  # Background box, the alpha sets its opacity
+    'clean_photos_since': None  # Photos captured before this time have their date burned in
+}
+
+OVERLAY_POSITIONS = ["top_left", "top_right", "bottom_left", "bottom_right"]
+
+def config_overlays(config):
+    """Overlay settings of a configuration, marking photos saved before overlays moved to render time"""
+    overlays = dict(DEFAULT_OVERLAYS, **config.get('overlays', {}))
+    if 'clean_photos_since' not in config.get('overlays', {}):
+        # Configuration from an older version: every photo captured so far has the date burned in
+        overlays['clean_photos_since'] = datetime.now().isoformat(timespec='seconds')
+    return overlays
+
+def overlay_style(overlays):
+    """Sprite style (font path, text scale, text RGBA, box RGBA) of overlay settings"""
+    overlays = dict(DEFAULT_OVERLAYS, **(overlays or {}))
+    colors = []
+    for key in ('text_color', 'box_color'):
+        try:
+            colors.append(ImageColor.getcolor(overlays[key], 'RGBA'))
+        except (ValueError, AttributeError):
+            colors.append(ImageColor.getcolor(DEFAULT_OVERLAYS[key], 'RGBA'))
+    try:
+        text_scale = max(0.1, float(overlays['text_scale']))
+    except (TypeError, ValueError):
+        text_scale = DEFAULT_OVERLAYS['text_scale']
+    return (overlays['font_path'], text_scale, colors[0], colors[1])
+
+def load_overlay_font(font_path, size):
+    """Load a TrueType font for overlays, falling back to common system fonts"""
+    for candidate in (font_path, "arial.ttf", "DejaVuSans.ttf"):
+        if candidate:
+            try:
+                return ImageFont.truetype(candidate, size)
+            except OSError:
+                continue
+    return ImageFont.load_default(size)
+
+class TextSpriteCache:
+    """LRU cache of anti-aliased text sprites, pre-multiplied for alpha blending"""
+    def __init__(self, max_sprites=256):
+        self.max_sprites = max_sprites
+        self.sprites = OrderedDict()  # (text, style, size) -> (premultiplied BGR, inverse alpha)
+        self.fonts = {}
+        self.lock = threading.Lock()
+    
+    def sprite(self, text, style, size):
+        key = (text, style, size)
+        font_path, _, text_color, box_color = style
+        with self.lock:
+            sprite = self.sprites.get(key)
+            if sprite is not None:
+                self.sprites.move_to_end(key)
+                return sprite
+            font = self.fonts.get((font_path, size))
+            if font is None:
+                font = self.fonts[(font_path, size)] = load_overlay_font(font_path, size)
+        
+        # Text on a translucent box, padded like the old burned-in date
+        left, top, right, bottom = font.getbbox(text)
+        padding = max(4, size // 3)
+        image = Image.new('RGBA', (right - left + 2 * padding, bottom - top + 2 * padding), box_color)
+        text_layer = Image.new('RGBA', image.size, (0, 0, 0, 0))
+        ImageDraw.Draw(text_layer).text((padding - left, padding - top), text, font=font, fill=text_color)
+        image = Image.alpha_composite(image, text_layer)
+        
+        rgba = np.asarray(image, dtype=np.float32)
+        alpha = rgba[:, :, 3:] / 255.0
+        sprite = (rgba[:, :, 2::-1] * alpha, 1.0 - alpha)
+        
+        with self.lock:
+            self.sprites[key] = sprite
+            if len(self.sprites) > self.max_sprites:
+                self.sprites.popitem(last=False)
+        return sprite
+
+def overlay_texts(photo_names, overlays):
+    """Per-photo (text, anchor) overlay lists for a render of photo_names"""
+    overlays = dict(DEFAULT_OVERLAYS, **(overlays or {}))
+    photo_dates = [parse_photo_date(name) for name in photo_names]
+    first_date = min((photo_date for photo_date in photo_dates if photo_date), default=None)
+    clean_since = overlays['clean_photos_since'] and datetime.fromisoformat(overlays['clean_photos_since'])
+    
+    def position(overlay):
+        anchor = overlays[f'{overlay}_position']
+        return anchor if anchor in OVERLAY_POSITIONS else DEFAULT_OVERLAYS[f'{overlay}_position']
+    
+    texts = {}
+    for name, photo_date in zip(photo_names, photo_dates):
+        photo_texts = []
+        # Legacy photos already show their date, a second one would be drawn over a different spot
+        photo_time = parse_photo_time(name) if clean_since else None
+        burned_in = photo_time is not None and photo_time < clean_since
+        if overlays['date'] and photo_date and not burned_in:
+            photo_texts.append((photo_date.strftime('%d/%m/%Y'), position('date')))
+        if overlays['day_counter'] and photo_date:
+            photo_texts.append((f"Day {(photo_date - first_date).days + 1}", position('day_counter')))
+        if overlays['custom_text']:
+            photo_texts.append((overlays['custom_text'], position('custom_text')))
+        texts[name] = photo_texts
+    return texts
+
+def composite_overlays(frame, texts, sprite_cache, style=None):
+    """Alpha-blend cached text sprites onto their regions of frame, in place"""
+    style = style or overlay_style(None)
+    height, width = frame.shape[:2]
+    size = max(10, int(height * style[1] / 24))
+    margin = max(4, height // 54)
+    stacked = {}  # Anchor -> height taken by texts already placed there
+    
+    for text, anchor in texts:
+        premultiplied, inverse_alpha = sprite_cache.sprite(text, style, size)
+        sprite_height, sprite_width = inverse_alpha.shape[:2]
+        sprite_height, sprite_width = min(sprite_height, height), min(sprite_width, width)
+        # Texts sharing a corner stack away from the edge instead of covering each other
+        offset = margin + stacked.get(anchor, 0)
+        stacked[anchor] = offset + sprite_height
+        x = width - sprite_width - margin if anchor.endswith('right') else margin
+        y = height - sprite_height - offset if anchor.startswith('bottom') else offset
+        x, y = min(max(0, x), width - sprite_width), min(max(0, y), height - sprite_height)
+        
+        # Only the region under the sprite is touched
+        roi = frame[y:y + sprite_height, x:x + sprite_width]
+        roi[:] = roi * inverse_alpha[:sprite_height, :sprite_width] + premultiplied[:sprite_height, :sprite_width]
+    return frame
+
+DEFAULT_MOSAIC = {
+    'columns': 40,
+    'tile_width': 480,
+    'tile_height': 270
+}
+
+class PNGStripWriter:
+    """Streams an RGB PNG to disk a strip of rows at a time, so the image never has to fit in memory"""
+    def __init__(self, path, width, height, compression=6):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self.compressor = zlib.compressobj(compression)
+        self.file = open(path + '.tmp', 'wb')
+        self.file.write(b'\x89PNG\r\n\x1a\n')
+        # 8-bit RGB, no interlacing
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+    
+    def _chunk(self, kind, data):
+        self.file.write(struct.pack('>I', len(data)) + kind + data)
+        self.file.write(struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+    
+    def write_rows(self, rows):
+        """Append BGR rows of shape (n, width, 3)"""
+        rows = rows[..., ::-1].reshape(rows.shape[0], -1)
+        # Sub filter: each byte stored as the difference from the same channel of the pixel to its left
+        filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = 1
+        filtered[:, 1:4] = rows[:, :3]
+        np.subtract(rows[:, 3:], rows[:, :-3], out=filtered[:, 4:])
+        
+        data = self.compressor.compress(filtered.tobytes())
+        if data:
+            self._chunk(b'IDAT', data)
+        self.rows_written += rows.shape[0]
+    
+    def close(self):
+        """Finish the image and move it into place"""
+        if self.rows_written != self.height:
+            self.abort()
+            raise ValueError(f"Wrote {self.rows_written} of {self.height} rows")
+        self._chunk(b'IDAT', self.compressor.flush())
+        self._chunk(b'IEND', b'')
+        self.file.close()
+        os.replace(self.path + '.tmp', self.path)
+    
+    def abort(self):
+        """Drop the unfinished image"""
+        self.file.close()
+        if os.path.exists(self.path + '.tmp'):
+            os.remove(self.path + '.tmp')
+
+class TargetWorker:
+    """Per-output thread that resizes frames for one target and feeds its writer"""
+    QUEUE_SIZE = 8
+    
+    def __init__(self, renderer, target, fps, texts, style, part_path, first_index):
+        self.renderer = renderer
+        self.target = target
+        self.texts = texts  # photo name -> overlay (text, anchor) list
+        self.style = style
+        self.settings = {"width": target["width"], "height": target["height"]}
+        self.reduced = target.get("reduced_decode", False)
+        self.writer = TARGET_WRITERS[target["kind"]](target, fps, part_path, first_index)
+        self.frames = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self.error = None
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+    
+    def _run(self):
+        try:
+            while True:
+                item = self.frames.get()
+                if item is None:
+                    break
+                if self.error:
+                    continue  # Keep draining so the decoder never blocks on a failed target
+                name, img = item
+                try:
+                    frame = self.renderer.processed_frame(name, self.settings, img, self.reduced)
+                except IOError:
+                    continue  # Unreadable photos are skipped, as in a full decode
+                except Exception as e:
+                    self.error = e
+                    continue
+                try:
+                    if self.texts.get(name):
+                        composite_overlays(frame, self.texts[name], self.renderer.sprite_cache, self.style)
+                    self.writer.write(frame)
+                except Exception as e:
+                    self.error = e
+        finally:
+            try:
+                self.writer.close()
+            except Exception as e:
+                self.error = self.error or e
+
+class TimelapseRenderer:
+    """Decodes each photo once and fans the frame out to one worker per output"""
+    def __init__(self, photo_store, frame_cache):
+        self.photo_store = photo_store
+        self.frame_cache = frame_cache
+        self.sprite_cache = TextSpriteCache()
+    
+    def processed_frame(self, name, settings, img=None, reduced=False):
+        """Frame of photo name processed for settings, from the frame cache when possible"""
+        def produce():
+            # Only full-size targets cause a full decode. When one was made for them anyway,
+            # downscaling it is about half the cost of decoding the photo again at reduced scale.
+            if img is not None:
+                source = img
+            elif reduced:
+                source = self.photo_store.read_thumbnail(name, settings["width"], settings["height"])
+            else:
+                source = self.photo_store.read_image(name)
+            return fit_frame(source, settings["width"], settings["height"])
+        
+        # Cached frames are clean; overlays are composited onto a private copy per target
+        frame = self.frame_cache.get(self.photo_store.photo_key(name), settings, produce)
+        return frame.copy() if frame is img else frame
+    
+    def build_palettes(self, photo_names, target):
+        """Palettes for an animated target: one global, or one per palette_segment frames"""
+        segment = target.get("palette_segment") or len(photo_names)
+        sample_width, sample_height = max(1, target["width"] // 4), max(1, target["height"] // 4)
+        samples_per_segment = max(1, PALETTE_SAMPLES * segment // len(photo_names))
+        
+        palettes = []
+        for start in range(0, len(photo_names), segment):
+            segment_names = photo_names[start:start + segment]
+            step = max(1, len(segment_names) // samples_per_segment)
+            thumbnails = []
+            for name in segment_names[::step]:
+                try:
+                    thumbnails.append(self.photo_store.read_thumbnail(name, sample_width, sample_height))
+                except (IOError, cv2.error):
+                    continue  # Unreadable photos are left out of the palette, as from the render
+            if thumbnails:
+                palettes.append((start, build_palette(thumbnails)))
+            elif palettes:
+                palettes.append((start, palettes[-1][1]))
+        if not palettes:
+            raise IOError("No readable photos to build a palette from")
+        return palettes
+    
+    def render(self, photo_names, targets, fps, progress=None, overlays=None, cancel_event=None, job_dir=None):
+        """Render photo_names to every target in checkpointed segments, returns False if cancelled"""
+        self.frame_cache.begin_render()
+        for target in targets:
+            if target["kind"] == "animated":
+                target["palettes"] = self.build_palettes(photo_names, target)
+        
+        texts = overlay_texts(photo_names, overlays)
+        style = overlay_style(overlays)
+        
+        temporary_dir = job_dir is None
+        if temporary_dir:
+            job_dir = tempfile.mkdtemp(prefix="face_render_")
+        os.makedirs(job_dir, exist_ok=True)
+        
+        segment_frames = self.segment_frames(targets, len(photo_names))
+        checkpoint_file = os.path.join(job_dir, "checkpoint.json")
+        segments_done = 0
+        try:
+            with open(checkpoint_file, 'r') as f:
+                checkpoint = json.load(f)
+            if checkpoint.get('segment_frames') == segment_frames:
+                segments_done = checkpoint['segments_done']
+        except (OSError, ValueError, KeyError):
+            pass
+        
+        segment_starts = list(range(0, len(photo_names), segment_frames))
+        try:
+            for segment_index, start in enumerate(segment_starts):
+                if segment_index < segments_done:
+                    continue
+                segment_names = photo_names[start:start + segment_frames]
+                part_paths = [self.part_path(job_dir, i, target, segment_index) for i, target in enumerate(targets)]
+                if not self._render_segment(segment_names, start, len(photo_names), targets, fps, texts, style,
+                                            part_paths, progress, cancel_event):
+                    # Drop the partial segment, completed ones stay for resuming
+                    for part_path in part_paths:
+                        if os.path.exists(part_path):
+                            os.remove(part_path)
+                    return False
+                
+                with open(checkpoint_file + '.tmp', 'w') as f:
+                    json.dump({'segment_frames': segment_frames, 'segments_done': segment_index + 1}, f)
+                os.replace(checkpoint_file + '.tmp', checkpoint_file)
+            
+            for i, target in enumerate(targets):
+                part_paths = [self.part_path(job_dir, i, target, k) for k in range(len(segment_starts))]
+                TARGET_WRITERS[target["kind"]].join(target, fps, part_paths)
+        finally:
+            if temporary_dir:
+                shutil.rmtree(job_dir, ignore_errors=True)
+        
+        # Finished jobs leave no checkpoints behind
+        shutil.rmtree(job_dir, ignore_errors=True)
+        return True
+    
+    def render_mosaic(self, photo_names, mosaic, progress=None, overlays=None, cancel_event=None):
+        """Compose photo_names into a PNG poster grid one tile row at a time, returns False if cancelled"""
+        columns, tile_width, tile_height = mosaic['columns'], mosaic['tile_width'], mosaic['tile_height']
+        rows = -(-len(photo_names) // columns)
+        texts = overlay_texts(photo_names, overlays)
+        style = overlay_style(overlays)
+        sprite_cache = TextSpriteCache()
+        
+        writer = PNGStripWriter(mosaic['path'], columns * tile_width, rows * tile_height)
+        try:
+            for row in range(rows):
+                # Only the current tile row is ever held in memory
+                strip = np.zeros((tile_height, columns * tile_width, 3), dtype=np.uint8)
+                for column, name in enumerate(photo_names[row * columns:(row + 1) * columns]):
+                    if cancel_event and cancel_event.is_set():
+                        writer.abort()
+                        return False
+                    
+                    try:
+                        thumbnail = self.photo_store.read_thumbnail(name, tile_width, tile_height)
+                    except IOError:
+                        thumbnail = None  # Unreadable photos leave a blank tile
+                    if thumbnail is not None:
+                        tile = strip[:, column * tile_width:(column + 1) * tile_width]
+                        tile[:] = fit_frame(thumbnail, tile_width, tile_height)
+                        composite_overlays(tile, texts[name], sprite_cache, style)
+                    
+                    if progress:
+                        progress(row * columns + column + 1, len(photo_names))
+                writer.write_rows(strip)
+            writer.close()
+        except BaseException:
+            writer.abort()
+            raise
+        return True
+    
+    @staticmethod
+    def segment_frames(targets, photo_count):
+        """Photos per checkpointed segment for a render of targets"""
+        # Video parts are joined by an ffmpeg stream copy; without ffmpeg joining would re-encode
+        # every frame a second time, so such renders are one segment and restart when interrupted
+        if any(target["kind"] == "video" for target in targets) and not shutil.which("ffmpeg"):
+            return max(1, photo_count)
+        return SEGMENT_FRAMES
+    
+    @staticmethod
+    def part_path(job_dir, target_index, target, segment_index):
+        """Segment part file of a target inside a job directory"""
+        extension = '.part' if target["kind"] == "animated" else os.path.splitext(target["path"])[1]
+        return os.path.join(job_dir, f"target{target_index}_segment{segment_index:04d}{extension}")
+    
+    def _render_segment(self, segment_names, first_index, total, targets, fps, texts, style,
+                        part_paths, progress, cancel_event):
+        """Render one segment of photos into part files, returns False if cancelled"""
+        workers = []
+        cancelled = False
+        try:
+            # Created inside the try, so workers already started are stopped if a later writer fails to open
+            for target, part_path in zip(targets, part_paths):
+                workers.append(TargetWorker(self, target, fps, texts, style, part_path, first_index))
+            full_decode_workers = [worker for worker in workers if not worker.reduced]
+            
+            for i, name in enumerate(segment_names):
+                if cancel_event and cancel_event.is_set():
+                    cancelled = True
+                    break
+                
+                # Skip the full decode when every full-size target already has this frame cached,
+                # reduced targets decode their own thumbnails in their worker threads
+                img = None
+                try:
+                    key = self.photo_store.photo_key(name)
+                    if not all(self.frame_cache.contains(key, worker.settings) for worker in full_decode_workers):
+                        img = self.photo_store.read_image(name)
+                except IOError:
+                    key = None
+                
+                if key is not None:
+                    for worker in workers:
+                        worker.frames.put((name, img))
+                
+                if progress:
+                    progress(first_index + i + 1, total)
+        finally:
+            for worker in workers:
+                worker.frames.put(None)
+            for worker in workers:
+                worker.thread.join()
+            self.frame_cache.flush()
+        
+        for worker in workers:
+            if worker.error:
+                raise worker.error
+        return not cancelled
+
+class RenderJobScheduler:
+    """Runs render jobs one at a time on a worker thread, reporting progress through an event queue"""
+    def __init__(self, renderer, jobs_dir):
+        self.renderer = renderer
+        self.jobs_dir = jobs_dir
+        self.jobs = queue.Queue()
+        # Polled by the UI thread: ('queued' | 'started' | 'cancelled', job_id),
+        # ('progress', job_id, done, total, frames_per_second, eta_seconds),
+        # ('done', job_id, paths) and ('error', job_id, message)
+        self.events = queue.Queue()
+        self.pending = {}  # job id -> job, queued or running
+        self.lock = threading.Lock()
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+    
+    @staticmethod
+    def job_id(spec):
+        """Stable id of a job spec, so resubmitting the same render resumes its checkpoints"""
+        return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:12]
+    
+    def job_dir(self, job_id):
+        return os.path.join(self.jobs_dir, job_id)
+    
+    def submit(self, spec):
+        """Queue a render described by spec: title, photo_names, targets and fps (or mosaic) and overlays"""
+        job_id = self.job_id(spec)
+        with self.lock:
+            if job_id in self.pending:
+                return job_id
+            job = {'id': job_id, 'spec': spec, 'cancel': threading.Event(), 'discard': False}
+            self.pending[job_id] = job
+        
+        # Saved spec lets an interrupted job be offered for resuming on the next start.
+        # Mosaics have no checkpoints and would start over, so they are not offered.
+        if 'mosaic' not in spec:
+            os.makedirs(self.job_dir(job_id), exist_ok=True)
+            with open(os.path.join(self.job_dir(job_id), "job.json"), 'w') as f:
+                json.dump(spec, f)
+        
+        self.events.put(('queued', job_id))
+        self.jobs.put(job)
+        return job_id
+    
+    def interrupted_jobs(self):
+        """Specs of jobs left unfinished by a previous session"""
+        specs = []
+        for job_id in sorted(os.listdir(self.jobs_dir)):
+            spec_file = os.path.join(self.job_dir(job_id), "job.json")
+            if job_id in self.pending or not os.path.exists(spec_file):
+                continue
+            try:
+                with open(spec_file, 'r') as f:
+                    specs.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return specs
+    
+    def discard(self, job_id):
+        """Remove the checkpoints of a job that is not running"""
+        shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+    
+    def cancel(self, job_id, keep_checkpoints=False):
+        """Cancel a queued or running job"""
+        with self.lock:
+            job = self.pending.get(job_id)
+            if job:
+                job['discard'] = not keep_checkpoints
+                job['cancel'].set()
+    
+    def shutdown(self, timeout=10):
+        """Stop after the current photo, keeping checkpoints so jobs resume next session"""
+        with self.lock:
+            for job in self.pending.values():
+                job['cancel'].set()
+        self.jobs.put(None)
+        self.thread.join(timeout)
+    
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            self._run_job(job)
+            with self.lock:
+                self.pending.pop(job['id'], None)
+    
+    def _run_job(self, job):
+        job_id, spec = job['id'], job['spec']
+        if job['cancel'].is_set():
+            self._finish_cancelled(job)
+            return
+        
+        self.events.put(('started', job_id))
+        started = time.time()
+        first_done = [None]
+        
+        def report_progress(done, total):
+            # Throughput counts only frames rendered this session, not resumed ones
+            if first_done[0] is None:
+                first_done[0] = done - 1
+            elapsed = time.time() - started
+            rendered = done - first_done[0]
+            rate = rendered / elapsed if elapsed > 0 else 0.0
+            eta = (total - done) / rate if rate > 0 else None
+            self.events.put(('progress', job_id, done, total, rate, eta))
+        
+        try:
+            if 'mosaic' in spec:
+                finished = self.renderer.render_mosaic(spec['photo_names'], spec['mosaic'], report_progress,
+                                                       spec.get('overlays'), job['cancel'])
+                paths = [spec['mosaic']['path']]
+            else:
+                targets = [dict(target) for target in spec['targets']]
+                finished = self.renderer.render(spec['photo_names'], targets, spec['fps'], report_progress,
+                                                spec.get('overlays'), job['cancel'], self.job_dir(job_id))
+                paths = [target['path'] for target in spec['targets']]
+        except Exception as e:
+            # A failed job is not offered for resuming on the next start
+            self.discard(job_id)
+            self.events.put(('error', job_id, str(e)))
+            return
+        
+        if finished:
+            self.events.put(('done', job_id, paths))
+        else:
+            self._finish_cancelled(job)
+    
+    def _finish_cancelled(self, job):
+        if job['discard']:
+            self.discard(job['id'])
+        self.events.put(('cancelled', job['id']))
+
+PROFILES_FILE = "profiles.json"
+DEFAULT_PROFILE = "default"
+
+DEFAULT_BATCH_SETTINGS = {
+    'quality': "High",
+    'fps': 5,
+    'max_workers': None,       # Defaults to one process per CPU
+    'memory_limit_mb': 4096    # Address space limit per render process, where the OS supports it
+}
+
+def read_config_file(config_file):
+    """Read a JSON configuration file, empty if missing or unreadable"""
+    try:
+        with open(config_file, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def load_profiles():
+    """Load profile registry; the default profile keeps the original single-user locations"""
+    profiles = read_config_file(PROFILES_FILE)
+    profiles.setdefault('profiles', {})
+    profiles['profiles'].setdefault(DEFAULT_PROFILE, {'photos_dir': "face_photos", 'config_file': "app_config.json"})
+    profiles['batch'] = dict(DEFAULT_BATCH_SETTINGS, **profiles.get('batch', {}))
+    # Renders of every profile go to output_dir/<profile>/ (older registries kept it under batch)
+    profiles.setdefault('output_dir', profiles['batch'].pop('output_dir', "timelapses"))
+    if profiles.get('active') not in profiles['profiles']:
+        profiles['active'] = DEFAULT_PROFILE
+    return profiles
+
+def save_profiles(profiles):
+    """Save profile registry"""
+    with open(PROFILES_FILE, 'w') as f:
+        json.dump(profiles, f, indent=2)
+
+def create_profile(profiles, name):
+    """Register a new profile with its own photo store and configuration"""
+    if not name or not all(c.isalnum() or c in '-_' for c in name):
+        raise ValueError("Profile names may only contain letters, digits, '-' and '_'.")
+    if name in profiles['profiles']:
+        raise ValueError(f"Profile '{name}' already exists.")
+    profile_dir = os.path.join("profiles", name)
+    profiles['profiles'][name] = {'photos_dir': os.path.join(profile_dir, "face_photos"),
+                                  'config_file': os.path.join(profile_dir, "app_config.json")}
+
+def profile_output_base(output_dir, profile, prefix, start_date, end_date):
+    """Output path, without extension, for a render of a profile's photos between two DDMMYYYY dates"""
+    profile_dir = os.path.join(output_dir, profile)
+    os.makedirs(profile_dir, exist_ok=True)
+    return os.path.join(profile_dir, f"{prefix}_{profile}_{start_date}_to_{end_date}")
+
+def photos_by_date(photo_store, from_date=None, to_date=None):
+    """(date, name) of photos within the date range (all photos without a range), sorted by date"""
+    filtered_files = []
+    for photo_name in photo_store.list_photos():
+        photo_date = parse_photo_date(photo_name)
+        if photo_date is None:
+            continue
+        if from_date and to_date and not from_date.date() <= photo_date <= to_date.date():
+            continue
+        filtered_files.append((photo_date, photo_name))
+    
+    # Sort by date
+    filtered_files.sort(key=lambda x: x[0])
+    return filtered_files
+
+def timelapse_targets(base_name, quality, extra_targets=()):
+    """Render targets for a main video at quality (none if quality is None) plus extra single-pass outputs"""
+    targets = []
+    if quality:
+        settings = VIDEO_QUALITY_SETTINGS[quality]
+        targets.append({"kind": "video", "width": settings["width"], "height": settings["height"],
+                        "path": f"{base_name}.mp4"})
+    for target_name in extra_targets:
+        target = dict(EXPORT_TARGETS[target_name])
+        target["path"] = base_name + target.pop("suffix")
+        targets.append(target)
+    return targets
+
+def profile_batch_jobs(profiles):
+    """One nightly render job per profile, using the registry's batch settings"""
+    batch = profiles['batch']
+    jobs = []
+    for name, paths in sorted(profiles['profiles'].items()):
+        config = read_config_file(paths['config_file'])
+        overlays = config_overlays(config)
+        if 'clean_photos_since' not in config.get('overlays', {}):
+            # Record the legacy photo cutoff now, so it and the batch checkpoint stay stable across runs
+            config['overlays'] = overlays
+            os.makedirs(os.path.dirname(paths['config_file']) or ".", exist_ok=True)
+            with open(paths['config_file'], 'w') as f:
+                json.dump(config, f)
+        frame_cache_mb = config.get('frame_cache_mb', 2048)
+        if batch['memory_limit_mb']:
+            # Frame cache buckets are memory-mapped, so they count against the limit
+            frame_cache_mb = min(frame_cache_mb, batch['memory_limit_mb'] // 4)
+        jobs.append({'profile': name,
+                     'photos_dir': paths['photos_dir'],
+                     'output_dir': profiles['output_dir'],
+                     'quality': batch['quality'],
+                     'fps': batch['fps'],
+                     'overlays': overlays,
+                     'frame_cache_bytes': frame_cache_mb * 1024 * 1024,
+                     'memory_limit_mb': batch['memory_limit_mb']})
+    return jobs
+
+def render_profile_job(job):
+    """Render one profile's full timelapse in a batch worker process, returns (profile, paths, error)"""
+    try:
+        if resource and job['memory_limit_mb']:
+            limit = job['memory_limit_mb'] * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        
+        photo_store = PhotoStore(job['photos_dir'])
+        # A cache of its own: the smaller batch budget must not evict or reset the app's frame cache
+        frame_cache = FrameCache(os.path.join(job['photos_dir'], "batch_frame_cache"), job['frame_cache_bytes'])
+        renderer = TimelapseRenderer(photo_store, frame_cache)
+        
+        photos = photos_by_date(photo_store)
+        if len(photos) < 2:
+            return job['profile'], [], "Not enough photos"
+        
+        start_date = photos[0][0].strftime('%d%m%Y')
+        end_date = photos[-1][0].strftime('%d%m%Y')
+        base_name = profile_output_base(job['output_dir'], job['profile'], "face_timelapse",
+                                        start_date, end_date)
+        
+        spec = {'title': os.path.basename(base_name),
+                'photo_names': [name for _, name in photos],
+                'targets': timelapse_targets(base_name, job['quality']),
+                'fps': job['fps'],
+                'overlays': job['overlays']}
+        # One checkpoint directory per profile, so a batch killed overnight resumes the next run.
+        # If photos or settings changed since, its parts no longer apply and are dropped.
+        job_dir = os.path.join(job['photos_dir'], "render_jobs", "batch")
+        job_id_file = os.path.join(job_dir, "batch_job_id")
+        job_id = RenderJobScheduler.job_id(spec)
+        try:
+            with open(job_id_file, 'r') as f:
+                checkpointed_id = f.read().strip()
+        except OSError:
+            checkpointed_id = None
+        if checkpointed_id != job_id:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            os.makedirs(job_dir)
+            with open(job_id_file, 'w') as f:
+                f.write(job_id)
+        if not renderer.render(spec['photo_names'], [dict(target) for target in spec['targets']], spec['fps'],
+                               overlays=spec['overlays'], job_dir=job_dir):
+            return job['profile'], [], "Interrupted, resumes on the next run"
+        return job['profile'], [target['path'] for target in spec['targets']], None
+    except MemoryError:
+        return job['profile'], [], f"Exceeded memory limit of {job['memory_limit_mb']} MB"
+    except Exception as e:
+        return job['profile'], [], str(e)
+
+class ProfileBatchRenderer:
+    """Renders every profile's timelapse through a shared pool of worker processes"""
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self.pool = None
+    
+    def run(self, jobs):
+        """Render all jobs, returns (profile, paths, error) per job as they finish"""
+        if not jobs:
+            return []
+        workers = min(len(jobs), self.max_workers or os.cpu_count() or 1)
+        # Spawned, not forked, workers: the parent may be running Tk and other threads.
+        # One job per worker process, so each job starts under a fresh memory limit.
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(processes=workers, maxtasksperchild=1) as pool:
+            self.pool = pool
+            results = list(pool.imap_unordered(render_profile_job, jobs))
+        self.pool = None
+        return results
+    
+    def terminate(self):
+        """Stop all worker processes; interrupted jobs resume from their checkpoints next run"""
+        if self.pool:
+            self.pool.terminate()
+
+def batch_summary(results):
+    """Readable per-profile outcome of a batch render"""
+    lines = []
+    for profile, paths, error in sorted(results):
+        if error:
+            lines.append(f"{profile}: failed - {error}")
+        else:
+            lines.append(f"{profile}: " + ", ".join(paths))
+    return "\n".join(lines)
+
+class PreviewFrameLoader:
+    """Background loader that prefetches low-res preview frames into a bounded buffer ahead of the playhead"""
+    def __init__(self, photo_store, photo_names, width, height, buffer_size=48, decorate=None):
+        self.photo_store = photo_store
+        self.photo_names = photo_names
+        self.decorate = decorate  # Optional callable(name, frame) drawing overlays onto a BGR frame
+        self.width, self.height = width, height
+        self.buffer_size = buffer_size
+        self.frames = {}  # frame index -> RGB PIL image
+        self.playhead = 0
+        self.running = True
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+    
+    def _window(self):
+        return range(self.playhead, min(self.playhead + self.buffer_size, len(self.photo_names)))
+    
+    def seek(self, index):
+        """Move the playhead, dropping buffered frames outside the new window"""
+        with self.condition:
+            self.playhead = index
+            window = self._window()
+            for buffered in [i for i in self.frames if i not in window]:
+                del self.frames[buffered]
+            self.condition.notify()
+    
+    def get(self, index):
+        """Buffered frame at index, or None if it is not loaded yet"""
+        with self.condition:
+            return self.frames.get(index)
+    
+    def _run(self):
+        while True:
+            with self.condition:
+                index = None
+                while self.running:
+                    # Nearest missing frame to the playhead first, so seeks show up immediately
+                    index = next((i for i in self._window() if i not in self.frames), None)
+                    if index is not None:
+                        break
+                    self.condition.wait()
+                if not self.running:
+                    return
+            
+            try:
+                name = self.photo_names[index]
+                frame = fit_frame(self.photo_store.read_thumbnail(name, self.width, self.height), self.width, self.height)
+                if self.decorate:
+                    self.decorate(name, frame)
+                frame = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            except IOError:
+                frame = Image.new('RGB', (self.width, self.height))
+            
+            with self.condition:
+                if index in self._window():
+                    self.frames[index] = frame
+    
+    def close(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+UI_FLUSH_MS = 16  # About one display refresh
+
+class UIState:
+    """Latest value of each bound widget, applied at most once per display refresh and only when it changed"""
+    def __init__(self, root):
+        self.root = root
+        self.setters = {}  # key -> function applying a value to its widget
+        self.shown = {}    # key -> value currently displayed
+        self.dirty = {}    # key -> value waiting for the next flush
+        self.flush_id = None
+    
+    def bind_text(self, key, text_widget):
+        """Bind a key to the contents of a Text widget"""
+        def set_text(value):
+            text_widget.delete(1.0, tk.END)
+            text_widget.insert(1.0, value)
+        self.setters[key] = set_text
+    
+    def set(self, key, value):
+        """Record a new value, scheduling a flush if the widget would change"""
+        if key not in self.dirty and key in self.shown and self.shown[key] == value:
+            return
+        self.dirty[key] = value
+        if self.flush_id is None:
+            self.flush_id = self.root.after(UI_FLUSH_MS, self.flush)
+    
+    def flush(self):
+        """Apply pending values to their widgets"""
+        self.flush_id = None
+        dirty, self.dirty = self.dirty, {}
+        for key, value in dirty.items():
+            if key in self.shown and self.shown[key] == value:
+                continue
+            self.setters[key](value)
+            self.shown[key] = value
 
 class FaceTimelapseApp:
     def __init__(self, root):
@@ -19,8 +1907,7 @@ class FaceTimelapseApp:
         # Alternative for other platforms: self.root.attributes('-fullscreen', True)
         
         # Configuration
-        self.photos_dir = "face_photos"
-        self.config_file = "app_config.json"
+        self.profiles = load_profiles()
         self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
         
         # Camera setup
@@ -28,13 +1915,25 @@ class FaceTimelapseApp:
         self.camera_active = False
         self.face_detected = False
         self.face_centered = False
-        self.reference_face_size = None
         
-        # Create directories
-        os.makedirs(self.photos_dir, exist_ok=True)
+        # Notification toast
+        self.toast_label = None
+        self.toast_after_id = None
         
-        # Load configuration
-        self.load_config()
+        self.render_windows = {}  # job id -> progress window widgets
+        
+        # Nightly renders of all profiles, run in worker processes
+        self.batch_renderer = None
+        self.batch_results = queue.Queue()
+        
+        # Background photo writer, encoding set by the active profile
+        self.photo_writer = PhotoWriter({})
+        
+        # Status, statistics and advice panels, updated only when their text changes
+        self.ui_state = UIState(self.root)
+        
+        # Photo store, configuration and render pipeline of the active profile
+        self.open_profile(self.profiles['active'])
         
         # Setup blue theme
         self.setup_blue_theme()
@@ -48,6 +1947,11 @@ class FaceTimelapseApp:
         # Start camera
         self.start_camera()
         
+        # Pick up results from the background photo writer and render jobs
+        self.poll_photo_writer()
+        self.poll_render_events()
+        self.root.after(500, self.resume_interrupted_renders)
+        
     def setup_blue_theme(self):
         """Setup blue theme for the application"""
         self.style = ttk.Style()
@@ -96,19 +2000,122 @@ class FaceTimelapseApp:
         else:
             self.root.state('zoomed')
     
+    def open_profile(self, name):
+        """Point photo storage, configuration, statistics and rendering at a profile"""
+        self.profile_name = name
+        self.photos_dir = self.profiles['profiles'][name]['photos_dir']
+        self.config_file = self.profiles['profiles'][name]['config_file']
+        self.root.title(f"Daily Face Timelapse Creator - {name}")
+        
+        self.reference_face_size = None
+        self.photo_encoding = dict(DEFAULT_PHOTO_ENCODING)
+        self.pack_after_days = 30
+        self.frame_cache_mb = 2048
+        self.overlay_settings = dict(DEFAULT_OVERLAYS)
+        
+        # Create directories
+        os.makedirs(self.photos_dir, exist_ok=True)
+        
+        # Loose and packed photo storage
+        self.photo_store = PhotoStore(self.photos_dir)
+        
+        # Statistics aggregate, kept next to the photos it describes
+        self.photo_stats = PhotoStatistics(os.path.join(self.photos_dir, "stats_index.json"))
+        self.photo_stats.load(self.photo_store.list_photos())
+        
+        # Load configuration
+        self.load_config()
+        
+        # Processed frames for re-renders
+        self.frame_cache = FrameCache(os.path.join(self.photos_dir, "frame_cache"),
+                                      self.frame_cache_mb * 1024 * 1024)
+        
+        # Single-pass render pipeline, with queued jobs checkpointed next to the photos
+        self.renderer = TimelapseRenderer(self.photo_store, self.frame_cache)
+        self.render_scheduler = RenderJobScheduler(self.renderer, os.path.join(self.photos_dir, "render_jobs"))
+        
+        # Drop temp files left behind by an interrupted write
+        for tmp_file in glob.glob(os.path.join(self.photos_dir, "face_*.tmp")):
+            os.remove(tmp_file)
+        self.photo_writer.encoding = dict(DEFAULT_PHOTO_ENCODING, **self.photo_encoding)
+    
+    def switch_profile(self, name):
+        """Switch the app to another profile, once its own renders have finished"""
+        if name == self.profile_name:
+            return
+        if self.render_scheduler.pending:
+            messagebox.showwarning("Rendering", "Wait for running renders to finish before switching profile.")
+            self.profile_var.set(self.profile_name)
+            return
+        
+        self.render_scheduler.shutdown()
+        self.frame_cache.flush()
+        self.profiles['active'] = name
+        save_profiles(self.profiles)
+        self.open_profile(name)
+        
+        self.profile_var.set(name)
+        self.preview_label.configure(image="", text="Select a photo to preview")
+        self.refresh_gallery()
+        self.update_statistics()
+        self.show_toast(f"👤 Switched to profile '{name}'")
+        self.root.after(500, self.resume_interrupted_renders)
+    
+    def new_profile(self):
+        """Create a profile with its own photos and calibration, and switch to it"""
+        name = simpledialog.askstring("New Profile", "Profile name:", parent=self.root)
+        if name is None:
+            return
+        try:
+            create_profile(self.profiles, name.strip())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        save_profiles(self.profiles)
+        self.profile_combo.configure(values=sorted(self.profiles['profiles']))
+        self.switch_profile(name.strip())
+    
+    def render_all_profiles(self):
+        """Render a full timelapse of every profile in background worker processes"""
+        if self.batch_renderer:
+            messagebox.showinfo("Rendering", "All profiles are already being rendered.")
+            return
+        jobs = profile_batch_jobs(self.profiles)
+        if not messagebox.askyesno("Render All Profiles",
+                                   f"Render full timelapses of {len(jobs)} profiles in the background?"):
+            return
+        
+        self.batch_renderer = ProfileBatchRenderer(self.profiles['batch']['max_workers'])
+        def run():
+            try:
+                self.batch_results.put(self.batch_renderer.run(jobs))
+            except Exception as e:
+                self.batch_results.put([(job['profile'], [], str(e)) for job in jobs])
+        
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+        self.show_toast(f"🌙 Rendering {len(jobs)} profiles...")
+    
     def load_config(self):
         """Load app configuration"""
-        try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r') as f:
-                    config = json.load(f)
-                    self.reference_face_size = config.get('reference_face_size')
-        except:
-            pass
+        config = read_config_file(self.config_file)
+        self.reference_face_size = config.get('reference_face_size')
+        self.photo_encoding.update(config.get('photo_encoding', {}))
+        self.pack_after_days = config.get('pack_after_days', self.pack_after_days)
+        self.frame_cache_mb = config.get('frame_cache_mb', self.frame_cache_mb)
+        self.overlay_settings = config_overlays(config)
+        if 'clean_photos_since' not in config.get('overlays', {}):
+            self.save_config()
     
     def save_config(self):
         """Save app configuration"""
-        config = {'reference_face_size': self.reference_face_size}
+        config = {'reference_face_size': self.reference_face_size,
+                  'photo_encoding': self.photo_encoding,
+                  'pack_after_days': self.pack_after_days,
+                  'frame_cache_mb': self.frame_cache_mb,
+                  'overlays': self.overlay_settings}
+        os.makedirs(os.path.dirname(self.config_file) or ".", exist_ok=True)
         with open(self.config_file, 'w') as f:
             json.dump(config, f)
     
@@ -136,6 +2143,7 @@ class FaceTimelapseApp:
         self.status_text = tk.Text(status_frame, height=4, wrap=tk.WORD, 
                                   bg='#5590f6', fg='white', insertbackground='white')
         self.status_text.pack(fill=tk.X, padx=5, pady=5)
+        self.ui_state.bind_text('status', self.status_text)
         
         # Controls frame
         controls_frame = ttk.LabelFrame(left_panel, text="Controls")
@@ -154,7 +2162,27 @@ class FaceTimelapseApp:
         
         self.create_video_btn = ttk.Button(button_frame, text="🎬 Create Timelapse", 
                                           command=self.create_timelapse_dialog)
-        self.create_video_btn.pack(side=tk.LEFT)
+        self.create_video_btn.pack(side=tk.LEFT, padx=(0, 5))
+        
+        ttk.Button(button_frame, text="🖼️ Export Mosaic",
+                  command=self.create_mosaic_dialog).pack(side=tk.LEFT)
+        
+        # Profiles, each with its own photos, calibration and renders
+        profile_frame = ttk.Frame(controls_frame)
+        profile_frame.pack(fill=tk.X, padx=5, pady=(0, 5))
+        
+        ttk.Label(profile_frame, text="👤 Profile:").pack(side=tk.LEFT)
+        self.profile_var = tk.StringVar(value=self.profile_name)
+        self.profile_combo = ttk.Combobox(profile_frame, textvariable=self.profile_var, state='readonly',
+                                          values=sorted(self.profiles['profiles']), width=15)
+        self.profile_combo.pack(side=tk.LEFT, padx=(5, 5))
+        self.profile_combo.bind('<<ComboboxSelected>>', lambda e: self.switch_profile(self.profile_var.get()))
+        
+        ttk.Button(profile_frame, text="➕ New Profile",
+                  command=self.new_profile).pack(side=tk.LEFT, padx=(0, 5))
+        
+        ttk.Button(profile_frame, text="🌙 Render All Profiles",
+                  command=self.render_all_profiles).pack(side=tk.LEFT)
         
         # Keyboard shortcuts info
         shortcuts_frame = ttk.Frame(controls_frame)
@@ -178,11 +2206,14 @@ class FaceTimelapseApp:
         gallery_controls.pack(fill=tk.X, padx=5, pady=5)
         
         ttk.Button(gallery_controls, text="🔄 Refresh", 
-                  command=self.refresh_gallery).pack(side=tk.LEFT)
+                  command=self.refresh_photos).pack(side=tk.LEFT)
         
         ttk.Button(gallery_controls, text="🗑️ Delete (Del)", 
                   command=self.delete_selected_photo, style="Delete.TButton").pack(side=tk.LEFT, padx=(5, 0))
         
+        ttk.Button(gallery_controls, text="📦 Pack Old", 
+                  command=self.pack_old_photos).pack(side=tk.LEFT, padx=(5, 0))
+        
         ttk.Button(gallery_controls, text="📂 Open Folder", 
                   command=self.open_photos_folder).pack(side=tk.RIGHT)
         
@@ -221,9 +2252,10 @@ class FaceTimelapseApp:
         stats_frame = ttk.LabelFrame(right_panel, text="Statistics")
         stats_frame.pack(fill=tk.X, pady=(10, 0))
         
-        self.stats_text = tk.Text(stats_frame, height=6, wrap=tk.WORD,
+        self.stats_text = tk.Text(stats_frame, height=9, wrap=tk.WORD,
                                  bg='#5590f6', fg='white', insertbackground='white')
         self.stats_text.pack(fill=tk.X, padx=5, pady=5)
+        self.ui_state.bind_text('stats', self.stats_text)
         
         # Advice Panel
         advice_frame = ttk.LabelFrame(right_panel, text="📝 Daily Timelapse Tips")
@@ -233,6 +2265,7 @@ class FaceTimelapseApp:
                                   bg='#5590f6', fg='white', insertbackground='white',
                                   font=('Arial', 9))
         self.advice_text.pack(fill=tk.X, padx=5, pady=5)
+        self.ui_state.bind_text('advice', self.advice_text)
         
         # Initialize advice
         self.setup_advice_system()
@@ -418,8 +2451,7 @@ class FaceTimelapseApp:
     
     def update_status(self, message):
         """Update status text"""
-        self.status_text.delete(1.0, tk.END)
-        self.status_text.insert(1.0, message)
+        self.ui_state.set('status', message)
     
     def set_reference_face(self):
         """Set reference face size for consistency"""
@@ -472,27 +2504,55 @@ class FaceTimelapseApp:
             start_y = (h - new_height) // 2
             frame = frame[start_y:start_y + new_height, :]
         
-        # Add date overlay
-        date_str = datetime.now().strftime("%d/%m/%Y")
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        text_size = cv2.getTextSize(date_str, font, 1, 2)[0]
-        
-        # Position date in bottom right
-        x = frame.shape[1] - text_size[0] - 20
-        y = frame.shape[0] - 20
-        
-        # Add background rectangle for better readability
-        cv2.rectangle(frame, (x - 10, y - text_size[1] - 10), 
-                     (x + text_size[0] + 10, y + 10), (0, 0, 0), -1)
-        cv2.putText(frame, date_str, (x, y), font, 1, (255, 255, 255), 2)
-        
-        # Save photo
-        filename = f"face_{datetime.now().strftime('%d%m%Y_%H%M%S')}.jpg"
+        # Photos are saved clean, date and other overlays are composited at render time
+        # Save photo in the background and return to the preview immediately
+        # The extension and the encoding the job runs with come from the same snapshot
+        encoding = dict(self.photo_writer.encoding)
+        filename = f"face_{datetime.now().strftime('%d%m%Y_%H%M%S')}{PhotoWriter.extension_for(encoding)}"
         filepath = os.path.join(self.photos_dir, filename)
         
-        cv2.imwrite(filepath, frame)
+        self.photo_writer.submit(frame, filepath, encoding)
+        self.show_toast(f"📸 Saving {filename}...")
+    
+    def poll_photo_writer(self):
+        """Apply finished background writes to gallery and statistics on the Tk thread"""
+        while True:
+            try:
+                filepath, error = self.photo_writer.results.get_nowait()
+            except queue.Empty:
+                break
+            
+            filename = os.path.basename(filepath)
+            if error:
+                messagebox.showerror("Error", f"Failed to save photo {filename}: {str(error)}")
+                continue
+            if os.path.dirname(filepath) != self.photos_dir:
+                continue  # Captured before switching profile
+            
+            self.photo_stats.add(filename)
+            self.gallery_listbox.insert(0, self.gallery_display_name(filename))
+            self.update_statistics()
+            self.show_toast(f"✅ Photo saved as {filename}")
         
-        messagebox.showinfo("Success", f"Photo saved as {filename}")
+        self.root.after(100, self.poll_photo_writer)
+    
+    def show_toast(self, message, duration=2500):
+        """Show a non-blocking notification at the bottom of the window"""
+        if self.toast_label is None:
+            self.toast_label = tk.Label(self.root, bg='#0065e0', fg='white',
+                                        font=('Arial', 11, 'bold'), padx=16, pady=8)
+        
+        self.toast_label.configure(text=message)
+        self.toast_label.place(relx=0.5, rely=0.95, anchor=tk.S)
+        self.toast_label.lift()
+        
+        if self.toast_after_id:
+            self.root.after_cancel(self.toast_after_id)
+        self.toast_after_id = self.root.after(duration, self.toast_label.place_forget)
+    
+    def refresh_photos(self):
+        """Rescan photos folder, resyncing gallery and statistics with changes made outside the app"""
+        self.photo_stats.rebuild(self.photo_store.list_photos())
         self.refresh_gallery()
         self.update_statistics()
     
@@ -500,20 +2560,19 @@ class FaceTimelapseApp:
         """Refresh photo gallery"""
         self.gallery_listbox.delete(0, tk.END)
         
-        photo_files = glob.glob(os.path.join(self.photos_dir, "face_*.jpg"))
-        photo_files.sort(reverse=True)  # Most recent first
+        photo_names = self.photo_store.list_photos()
+        photo_names.sort(reverse=True)  # Most recent first
         
-        for photo_file in photo_files:
-            basename = os.path.basename(photo_file)
-            # Extract date from filename
-            try:
-                date_part = basename.split('_')[1].split('_')[0]
-                date_obj = datetime.strptime(date_part, '%d%m%Y')
-                display_name = f"{date_obj.strftime('%d/%m/%Y')} - {basename}"
-            except:
-                display_name = basename
-            
-            self.gallery_listbox.insert(tk.END, display_name)
+        for photo_name in photo_names:
+            self.gallery_listbox.insert(tk.END, self.gallery_display_name(photo_name))
+    
+    def gallery_display_name(self, basename):
+        """Gallery entry text for a photo filename"""
+        # Extract date from filename
+        photo_date = parse_photo_date(basename)
+        if photo_date:
+            return f"{photo_date.strftime('%d/%m/%Y')} - {basename}"
+        return basename
     
     def on_photo_select(self, event):
         """Handle photo selection in gallery"""
@@ -528,20 +2587,11 @@ class FaceTimelapseApp:
         try:
             selected_item = self.gallery_listbox.get(selection[0])
             filename = selected_item.split(' - ')[-1]
-            filepath = os.path.join(self.photos_dir, filename)
-            
-            if os.path.exists(filepath):
-                # Load and resize image for preview
-                img = Image.open(filepath)
-                # Calculate aspect ratio preserving resize
-                img_width, img_height = img.size
-                max_width, max_height = 280, 200
-                
-                ratio = min(max_width/img_width, max_height/img_height)
-                new_width = int(img_width * ratio)
-                new_height = int(img_height * ratio)
-                
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            
+            if self.photo_store.exists(filename):
+                # Decode at reduced scale, aspect ratio preserving, for preview
+                thumbnail = self.photo_store.read_thumbnail(filename, 280, 200)
+                img = Image.fromarray(cv2.cvtColor(thumbnail, cv2.COLOR_BGR2RGB))
                 photo = ImageTk.PhotoImage(img)
                 
                 self.preview_label.configure(image=photo, text="")
@@ -563,9 +2613,8 @@ class FaceTimelapseApp:
         try:
             selected_item = self.gallery_listbox.get(selection[0])
             filename = selected_item.split(' - ')[-1]
-            filepath = os.path.join(self.photos_dir, filename)
             
-            if not os.path.exists(filepath):
+            if not self.photo_store.exists(filename):
                 messagebox.showerror("Error", "Photo file not found.")
                 return
             
@@ -575,7 +2624,7 @@ class FaceTimelapseApp:
             full_view.configure(bg='#5590f6')
             
             # Load image
-            img = Image.open(filepath)
+            img = Image.fromarray(cv2.cvtColor(self.photo_store.read_image(filename), cv2.COLOR_BGR2RGB))
             
             # Calculate window size (max 80% of screen)
             screen_width = self.root.winfo_screenwidth()
@@ -617,15 +2666,14 @@ class FaceTimelapseApp:
         try:
             selected_item = self.gallery_listbox.get(selection[0])
             filename = selected_item.split(' - ')[-1]
-            filepath = os.path.join(self.photos_dir, filename)
             
             # Confirm deletion
             result = messagebox.askyesno("Confirm Deletion", 
                                        f"Are you sure you want to delete '{filename}'?\n\nThis action cannot be undone.")
             
             if result:
-                if os.path.exists(filepath):
-                    os.remove(filepath)
+                if self.photo_store.delete(filename):
+                    self.photo_stats.remove(filename)
                     messagebox.showinfo("Success", f"Photo '{filename}' has been deleted.")
                     
                     # Clear preview if this photo was being previewed
@@ -641,6 +2689,24 @@ class FaceTimelapseApp:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to delete photo: {str(e)}")
     
+    def pack_old_photos(self):
+        """Consolidate photos older than pack_after_days into pack files"""
+        result = messagebox.askyesno("Pack Old Photos",
+                                     f"Move photos older than {self.pack_after_days} days into pack files?\n\n"
+                                     "They stay available in the gallery and timelapses.")
+        if not result:
+            return
+        
+        try:
+            self.root.config(cursor="watch")
+            self.root.update_idletasks()
+            packed = self.photo_store.pack_photos(self.pack_after_days)
+            self.show_toast(f"📦 Packed {packed} photos")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to pack photos: {str(e)}")
+        finally:
+            self.root.config(cursor="")
+    
     def open_photos_folder(self):
         """Open photos folder in file explorer"""
         import subprocess
@@ -655,43 +2721,31 @@ class FaceTimelapseApp:
     
     def update_statistics(self):
         """Update statistics display"""
-        photo_files = glob.glob(os.path.join(self.photos_dir, "face_*.jpg"))
+        stats_data = self.photo_stats
         
-        if not photo_files:
+        if stats_data.total_photos == 0:
             stats = "No photos captured yet.\nStart your daily photo journey!"
         else:
-            # Group by date
-            dates = defaultdict(int)
-            for photo_file in photo_files:
-                try:
-                    basename = os.path.basename(photo_file)
-                    date_part = basename.split('_')[1].split('_')[0]
-                    date_obj = datetime.strptime(date_part, '%d%m%Y')
-                    date_key = date_obj.strftime('%Y-%m-%d')
-                    dates[date_key] += 1
-                except:
-                    continue
-            
-            total_photos = len(photo_files)
-            unique_dates = len(dates)
+            unique_dates = stats_data.unique_dates
             
-            if dates:
-                first_date = min(dates.keys())
-                last_date = max(dates.keys())
-                date_range = (datetime.strptime(last_date, '%Y-%m-%d') - 
-                            datetime.strptime(first_date, '%Y-%m-%d')).days + 1
+            if unique_dates:
+                date_range = (stats_data.last_day - stats_data.first_day).days + 1
                 consistency = f"{unique_dates}/{date_range} days"
+                latest = stats_data.last_day.isoformat()
             else:
                 consistency = "0/0 days"
+                latest = 'None'
             
-            stats = f"""Total Photos: {total_photos}
+            stats = f"""Total Photos: {stats_data.total_photos}
 Unique Dates: {unique_dates}
 Consistency: {consistency}
-Latest: {max(dates.keys()) if dates else 'None'}
-Ready for timelapse: {'Yes' if total_photos >= 2 else 'No'}"""
+Current Streak: {stats_data.current_streak} days
+Longest Streak: {stats_data.longest_streak} days
+Gaps: {stats_data.gap_count} ({stats_data.missed_days} missed days)
+Latest: {latest}
+Ready for timelapse: {'Yes' if stats_data.total_photos >= 2 else 'No'}"""
         
-        self.stats_text.delete(1.0, tk.END)
-        self.stats_text.insert(1.0, stats)
+        self.ui_state.set('stats', stats)
     
     def setup_advice_system(self):
         """Setup and display daily timelapse advice"""
@@ -727,8 +2781,7 @@ Ready for timelapse: {'Yes' if total_photos >= 2 else 'No'}"""
         """Update the advice display"""
         if hasattr(self, 'advice_tips') and self.advice_tips:
             tip = self.advice_tips[self.current_tip_index]
-            self.advice_text.delete(1.0, tk.END)
-            self.advice_text.insert(1.0, tip)
+            self.ui_state.set('advice', tip)
     
     def advice_timer(self):
         """Timer to automatically cycle through advice tips"""
@@ -741,7 +2794,7 @@ Ready for timelapse: {'Yes' if total_photos >= 2 else 'No'}"""
     
     def create_timelapse_dialog(self):
         """Show timelapse creation dialog"""
-        photo_files = glob.glob(os.path.join(self.photos_dir, "face_*.jpg"))
+        photo_files = self.photo_store.list_photos()
         if len(photo_files) < 2:
             messagebox.showwarning("Warning", "Need at least 2 photos to create a timelapse.")
             return
@@ -749,7 +2802,7 @@ Ready for timelapse: {'Yes' if total_photos >= 2 else 'No'}"""
         # Create dialog
         dialog = tk.Toplevel(self.root)
         dialog.title("Create Timelapse Video")
-        dialog.geometry("400x300")
+        dialog.geometry("400x640")
         dialog.configure(bg='#5590f6')
         dialog.grab_set()
         
@@ -785,29 +2838,90 @@ Ready for timelapse: {'Yes' if total_photos >= 2 else 'No'}"""
                     values=["Low", "Medium", "High"], width=10)
         quality_combo.grid(row=1, column=1, padx=5, pady=5)
         
+        # Unticked, only the extra outputs are rendered, e.g. a GIF clip from thumbnail-size decodes
+        main_video_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(settings_frame, text="Main MP4 video", variable=main_video_var).grid(
+            row=2, column=0, columnspan=2, sticky=tk.W, padx=5, pady=5)
+        
+        # Overlays composited at render time
+        overlays_frame = ttk.LabelFrame(dialog, text="Overlays")
+        overlays_frame.pack(fill=tk.X, padx=20, pady=(0, 10))
+        
+        date_overlay_var = tk.BooleanVar(value=self.overlay_settings['date'])
+        ttk.Checkbutton(overlays_frame, text="Date", variable=date_overlay_var).grid(
+            row=0, column=0, sticky=tk.W, padx=5, pady=2)
+        day_counter_var = tk.BooleanVar(value=self.overlay_settings['day_counter'])
+        ttk.Checkbutton(overlays_frame, text="Day counter", variable=day_counter_var).grid(
+            row=1, column=0, sticky=tk.W, padx=5, pady=2)
+        ttk.Label(overlays_frame, text="Text:").grid(row=2, column=0, sticky=tk.W, padx=5, pady=2)
+        custom_text_var = tk.StringVar(value=self.overlay_settings['custom_text'])
+        ttk.Entry(overlays_frame, textvariable=custom_text_var, width=25).grid(
+            row=2, column=1, sticky=tk.W, padx=5, pady=2)
+        
+        # Corner of each overlay, text size and colours stay in the configuration
+        position_vars = {}
+        for row, overlay in enumerate(('date', 'day_counter', 'custom_text')):
+            position_vars[overlay] = tk.StringVar(value=self.overlay_settings[f'{overlay}_position'])
+            ttk.Combobox(overlays_frame, textvariable=position_vars[overlay], values=OVERLAY_POSITIONS,
+                         state="readonly", width=12).grid(row=row, column=2, sticky=tk.W, padx=5, pady=2)
+        
+        def read_overlays():
+            self.overlay_settings.update({'date': date_overlay_var.get(),
+                                          'day_counter': day_counter_var.get(),
+                                          'custom_text': custom_text_var.get().strip()})
+            self.overlay_settings.update({f'{overlay}_position': var.get() for overlay, var in position_vars.items()})
+            self.save_config()
+            return dict(self.overlay_settings)
+        
+        # Extra outputs rendered from the same decode pass
+        targets_frame = ttk.LabelFrame(dialog, text="Extra Outputs (Single Pass)")
+        targets_frame.pack(fill=tk.X, padx=20, pady=(0, 10))
+        
+        target_vars = {}
+        for i, target_name in enumerate(EXPORT_TARGETS):
+            target_vars[target_name] = tk.BooleanVar(value=False)
+            ttk.Checkbutton(targets_frame, text=target_name, variable=target_vars[target_name]).grid(
+                row=i // 2, column=i % 2, sticky=tk.W, padx=5, pady=2)
+        
         # Buttons
         button_frame = ttk.Frame(dialog)
         button_frame.pack(pady=20)
         
+        def read_range():
+            from_str = from_date.get().strip()
+            to_str = to_date.get().strip()
+            
+            if from_str and to_str:
+                return datetime.strptime(from_str, "%d/%m/%Y"), datetime.strptime(to_str, "%d/%m/%Y")
+            return None, None
+        
         def create_video():
             try:
-                from_str = from_date.get().strip()
-                to_str = to_date.get().strip()
-                
-                if from_str and to_str:
-                    from_dt = datetime.strptime(from_str, "%d/%m/%Y")
-                    to_dt = datetime.strptime(to_str, "%d/%m/%Y")
-                else:
-                    from_dt = None
-                    to_dt = None
+                from_dt, to_dt = read_range()
                 
                 fps = int(fps_var.get())
+                extra_targets = [name for name, var in target_vars.items() if var.get()]
+                quality = quality_var.get() if main_video_var.get() else None
+                if not quality and not extra_targets:
+                    messagebox.showerror("Error", "Select the main video or at least one extra output.")
+                    return
+                overlays = read_overlays()
                 dialog.destroy()
-                self.create_timelapse_video(from_dt, to_dt, fps, quality_var.get())
+                self.create_timelapse_video(from_dt, to_dt, fps, quality, extra_targets, overlays)
                 
             except ValueError:
                 messagebox.showerror("Error", "Invalid date format. Use DD/MM/YYYY")
         
+        def preview_video():
+            try:
+                from_dt, to_dt = read_range()
+                fps = int(fps_var.get())
+            except ValueError:
+                messagebox.showerror("Error", "Invalid date format. Use DD/MM/YYYY")
+                return
+            self.open_preview_player(self.photos_in_range(from_dt, to_dt), fps, dialog, read_overlays())
+        
+        ttk.Button(button_frame, text="▶ Preview", command=preview_video).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Create Video", command=create_video, style='BlueAccent.TButton').pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Cancel", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
         
@@ -829,85 +2943,295 @@ Ready for timelapse: {'Yes' if total_photos >= 2 else 'No'}"""
             except:
                 pass
     
-    def create_timelapse_video(self, from_date, to_date, fps, quality):
-        """Create timelapse video"""
-        def create_video_thread():
+    def create_mosaic_dialog(self):
+        """Show poster mosaic export dialog"""
+        photos = self.photos_in_range(None, None)
+        if not photos:
+            messagebox.showwarning("Warning", "No photos to export yet.")
+            return
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Export Mosaic Poster")
+        dialog.geometry("360x300")
+        dialog.configure(bg='#5590f6')
+        dialog.grab_set()
+        
+        settings_frame = ttk.LabelFrame(dialog, text="Grid Settings")
+        settings_frame.pack(fill=tk.X, padx=20, pady=10)
+        
+        mosaic_vars = {}
+        for row, (key, label) in enumerate((('columns', "Columns:"),
+                                            ('tile_width', "Tile width (px):"),
+                                            ('tile_height', "Tile height (px):"))):
+            ttk.Label(settings_frame, text=label).grid(row=row, column=0, sticky=tk.W, padx=5, pady=5)
+            mosaic_vars[key] = tk.StringVar(value=str(DEFAULT_MOSAIC[key]))
+            ttk.Entry(settings_frame, textvariable=mosaic_vars[key], width=10).grid(row=row, column=1, padx=5, pady=5)
+        
+        date_labels_var = tk.BooleanVar(value=self.overlay_settings['date'])
+        ttk.Checkbutton(settings_frame, text="Date labels", variable=date_labels_var).grid(
+            row=3, column=0, columnspan=2, sticky=tk.W, padx=5, pady=5)
+        
+        size_var = tk.StringVar()
+        ttk.Label(dialog, textvariable=size_var).pack(pady=5)
+        
+        def read_mosaic():
+            mosaic = {key: int(var.get()) for key, var in mosaic_vars.items()}
+            if min(mosaic.values()) < 1:
+                raise ValueError
+            return mosaic
+        
+        def update_size(*args):
             try:
-                # Get photo files in date range
-                photo_files = glob.glob(os.path.join(self.photos_dir, "face_*.jpg"))
-                filtered_files = []
-                
-                for photo_file in photo_files:
-                    try:
-                        basename = os.path.basename(photo_file)
-                        date_str = basename.split('_')[1].split('_')[0]
-                        photo_date = datetime.strptime(date_str, '%d%m%Y')
-                        
-                        if from_date and to_date:
-                            if from_date <= photo_date <= to_date:
-                                filtered_files.append((photo_date, photo_file))
-                        else:
-                            filtered_files.append((photo_date, photo_file))
-                    except:
-                        continue
-                
-                if len(filtered_files) < 2:
-                    messagebox.showerror("Error", "Not enough photos in date range.")
-                    return
-                
-                # Sort by date
-                filtered_files.sort(key=lambda x: x[0])
-                
-                # Create video filename
-                start_date = filtered_files[0][0].strftime('%d%m%Y')
-                end_date = filtered_files[-1][0].strftime('%d%m%Y')
-                video_filename = f"face_timelapse_{start_date}_to_{end_date}.mp4"
-                
-                # Quality settings
-                quality_settings = {
-                    "Low": {"width": 640, "height": 480, "bitrate": "500k"},
-                    "Medium": {"width": 1280, "height": 720, "bitrate": "2000k"},
-                    "High": {"width": 1920, "height": 1080, "bitrate": "5000k"}
-                }
-                
-                settings = quality_settings[quality]
-                
-                # Read first image to get dimensions
-                first_img = cv2.imread(filtered_files[0][1])
-                height, width = first_img.shape[:2]
-                
-                # Setup video writer
-                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                out = cv2.VideoWriter(video_filename, fourcc, fps, (width, height))
-                
-                # Process each image
-                for i, (date, photo_file) in enumerate(filtered_files):
-                    img = cv2.imread(photo_file)
-                    if img is not None:
-                        out.write(img)
-                    
-                    # Update progress (this is simplified - in a real app you'd use a progress bar)
-                    progress = (i + 1) / len(filtered_files) * 100
-                    print(f"Progress: {progress:.1f}%")
-                
-                out.release()
-                
-                messagebox.showinfo("Success", f"Timelapse video created: {video_filename}")
-                
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to create video: {str(e)}")
+                mosaic = read_mosaic()
+            except ValueError:
+                size_var.set("Enter whole numbers above 0")
+                return
+            rows = -(-len(photos) // mosaic['columns'])
+            size_var.set(f"{len(photos)} photos: {mosaic['columns']}x{rows} tiles, "
+                         f"{mosaic['columns'] * mosaic['tile_width']}x{rows * mosaic['tile_height']} px")
         
-        # Run in separate thread to prevent GUI freezing
-        thread = threading.Thread(target=create_video_thread)
-        thread.daemon = True
-        thread.start()
+        for var in mosaic_vars.values():
+            var.trace_add('write', update_size)
+        update_size()
+        
+        def export_mosaic():
+            try:
+                mosaic = read_mosaic()
+            except ValueError:
+                messagebox.showerror("Error", "Columns and tile size must be whole numbers above 0.")
+                return
+            dialog.destroy()
+            
+            start_date = photos[0][0].strftime('%d%m%Y')
+            end_date = photos[-1][0].strftime('%d%m%Y')
+            mosaic['path'] = profile_output_base(self.profiles['output_dir'], self.profile_name, "face_mosaic",
+                                                 start_date, end_date) + ".png"
+            overlays = dict(self.overlay_settings, date=date_labels_var.get(), day_counter=False, custom_text='')
+            self.submit_render({'title': os.path.basename(mosaic['path']),
+                                'photo_names': [name for _, name in photos],
+                                'mosaic': mosaic,
+                                'overlays': overlays})
+        
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(pady=10)
+        ttk.Button(button_frame, text="Export", command=export_mosaic, style='BlueAccent.TButton').pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Cancel", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
+    
+    def photos_in_range(self, from_date, to_date):
+        """(date, name) of photos within the date range (all photos without a range), sorted by date"""
+        return photos_by_date(self.photo_store, from_date, to_date)
+    
+    def open_preview_player(self, photos, fps, parent, overlays=None):
+        """Play photos at fps from low-res prefetched frames, without encoding anything"""
+        if len(photos) < 2:
+            messagebox.showerror("Error", "Not enough photos in date range.")
+            return
+        
+        photo_names = [name for _, name in photos]
+        texts = overlay_texts(photo_names, overlays)
+        style = overlay_style(overlays)
+        
+        def decorate(name, frame):
+            composite_overlays(frame, texts[name], self.renderer.sprite_cache, style)
+        
+        loader = PreviewFrameLoader(self.photo_store, photo_names, 640, 360, decorate=decorate)
+        frame_delay = max(1, int(1000 / max(1, fps)))
+        state = {'index': 0, 'playing': True, 'shown': None, 'after_id': None}
+        
+        player = tk.Toplevel(parent)
+        player.title("Timelapse Preview")
+        player.configure(bg='#5590f6')
+        player.transient(parent)
+        parent.grab_release()
+        player.grab_set()
+        
+        screen_label = tk.Label(player, text="Loading...", bg="#000000", fg="white")
+        screen_label.pack(padx=10, pady=(10, 5))
+        
+        info_var = tk.StringVar()
+        ttk.Label(player, textvariable=info_var).pack()
+        
+        position_var = tk.DoubleVar(value=0)
+        scrubber = ttk.Scale(player, from_=0, to=len(photo_names) - 1, orient=tk.HORIZONTAL,
+                             variable=position_var, length=640)
+        scrubber.pack(padx=10, pady=5)
+        
+        controls = ttk.Frame(player)
+        controls.pack(pady=(0, 10))
+        
+        def show_frame():
+            """Display the frame at the playhead once the loader has it, returns whether it was shown"""
+            index = state['index']
+            if state['shown'] == index:
+                return True
+            frame = loader.get(index)
+            if frame is None:
+                return False
+            photo = ImageTk.PhotoImage(frame)
+            screen_label.configure(image=photo, text="")
+            screen_label.image = photo
+            state['shown'] = index
+            info_var.set(f"{photos[index][0].strftime('%d/%m/%Y')}  ({index + 1}/{len(photo_names)})")
+            return True
+        
+        def tick():
+            if show_frame() and state['playing']:
+                if state['index'] < len(photo_names) - 1:
+                    state['index'] += 1
+                    loader.seek(state['index'])
+                    position_var.set(state['index'])
+                else:
+                    toggle_play()
+                state['after_id'] = player.after(frame_delay, tick)
+            else:
+                # Paused, or waiting for the loader to catch up
+                state['after_id'] = player.after(15, tick)
+        
+        def on_scrub(value):
+            index = int(round(float(value)))
+            if index != state['index']:
+                state['index'] = index
+                loader.seek(index)
+        
+        def toggle_play():
+            if not state['playing'] and state['index'] >= len(photo_names) - 1:
+                state['index'] = 0
+                loader.seek(0)
+                position_var.set(0)
+            state['playing'] = not state['playing']
+            play_button.configure(text="⏸ Pause" if state['playing'] else "▶ Play")
+        
+        def close_player():
+            if state['after_id']:
+                player.after_cancel(state['after_id'])
+            loader.close()
+            player.grab_release()
+            player.destroy()
+            if parent.winfo_exists():
+                parent.grab_set()
+        
+        scrubber.configure(command=on_scrub)
+        play_button = ttk.Button(controls, text="⏸ Pause", command=toggle_play, style='BlueAccent.TButton')
+        play_button.pack(side=tk.LEFT, padx=5)
+        ttk.Button(controls, text="Close", command=close_player).pack(side=tk.LEFT, padx=5)
+        
+        player.protocol("WM_DELETE_WINDOW", close_player)
+        tick()
+    
+    def create_timelapse_video(self, from_date, to_date, fps, quality, extra_targets=(), overlays=None):
+        """Queue a timelapse video (skipped if quality is None), plus any extra outputs, as one single-pass render job"""
+        # Get photo files in date range
+        filtered_files = self.photos_in_range(from_date, to_date)
+        
+        if len(filtered_files) < 2:
+            messagebox.showerror("Error", "Not enough photos in date range.")
+            return
+        
+        # Create video filename
+        start_date = filtered_files[0][0].strftime('%d%m%Y')
+        end_date = filtered_files[-1][0].strftime('%d%m%Y')
+        base_name = profile_output_base(self.profiles['output_dir'], self.profile_name, "face_timelapse",
+                                        start_date, end_date)
+        
+        # Main video at the selected quality, extras fanned out from the same frames
+        targets = timelapse_targets(base_name, quality, extra_targets)
+        self.submit_render({'title': os.path.basename(targets[0]['path']),
+                            'photo_names': [name for _, name in filtered_files],
+                            'targets': targets,
+                            'fps': fps,
+                            'overlays': overlays})
+    
+    def submit_render(self, spec):
+        """Queue a render job and open its progress window"""
+        job_id = self.render_scheduler.submit(spec)
+        if job_id in self.render_windows:
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("Rendering Timelapse")
+        window.geometry("420x150")
+        window.configure(bg='#5590f6')
+        
+        ttk.Label(window, text=spec['title']).pack(pady=(10, 5))
+        progress_bar = ttk.Progressbar(window, orient=tk.HORIZONTAL, length=380, mode='determinate')
+        progress_bar.pack(padx=20, pady=5)
+        status_var = tk.StringVar(value="Queued...")
+        ttk.Label(window, textvariable=status_var).pack(pady=5)
+        
+        # Closing the window cancels the job, like the Cancel button
+        cancel = lambda: self.render_scheduler.cancel(job_id)
+        ttk.Button(window, text="Cancel", command=cancel, style="Delete.TButton").pack(pady=5)
+        window.protocol("WM_DELETE_WINDOW", cancel)
+        
+        self.render_windows[job_id] = {'window': window, 'progress': progress_bar, 'status': status_var}
+    
+    def poll_render_events(self):
+        """Apply render job events to progress windows on the Tk thread"""
+        while True:
+            try:
+                event = self.render_scheduler.events.get_nowait()
+            except queue.Empty:
+                break
+            
+            kind, job_id = event[0], event[1]
+            widgets = self.render_windows.get(job_id)
+            if kind == 'started' and widgets:
+                widgets['status'].set("Starting...")
+            elif kind == 'progress' and widgets:
+                done, total, rate, eta = event[2:]
+                widgets['progress'].configure(maximum=total, value=done)
+                eta_text = str(timedelta(seconds=int(eta))) if eta is not None else "--:--"
+                widgets['status'].set(f"{done}/{total} photos • {rate:.1f} photos/s • ETA {eta_text}")
+            elif kind in ('done', 'cancelled', 'error'):
+                if widgets:
+                    widgets['window'].destroy()
+                    del self.render_windows[job_id]
+                if kind == 'done':
+                    created = "\n".join(event[2])
+                    messagebox.showinfo("Success", f"Timelapse created:\n{created}")
+                elif kind == 'cancelled':
+                    self.show_toast("⏹ Render cancelled")
+                else:
+                    messagebox.showerror("Error", f"Failed to create video: {event[2]}")
+        
+        try:
+            batch_results = self.batch_results.get_nowait()
+        except queue.Empty:
+            batch_results = None
+        if batch_results is not None:
+            self.batch_renderer = None
+            messagebox.showinfo("Render All Profiles", batch_summary(batch_results))
+        
+        self.root.after(100, self.poll_render_events)
+    
+    def resume_interrupted_renders(self):
+        """Offer to resume renders interrupted in a previous session"""
+        for spec in self.render_scheduler.interrupted_jobs():
+            if messagebox.askyesno("Resume Render",
+                                   f"Rendering of '{spec['title']}' was interrupted.\n\n"
+                                   "Resume from the last checkpoint?"):
+                self.submit_render(spec)
+            else:
+                self.render_scheduler.discard(self.render_scheduler.job_id(spec))
     
     def __del__(self):
         """Cleanup"""
         if self.cap:
             self.cap.release()
+        if hasattr(self, 'photo_writer') and self.photo_writer.thread.is_alive():
+            self.photo_writer.close()
+
+def render_all_profiles_headless():
+    """Render every profile without the GUI, e.g. from a nightly scheduled task"""
+    profiles = load_profiles()
+    results = ProfileBatchRenderer(profiles['batch']['max_workers']).run(profile_batch_jobs(profiles))
+    print(batch_summary(results))
+    return 1 if any(error for _, _, error in results) else 0
 
 def main():
+    if '--render-all' in sys.argv:
+        sys.exit(render_all_profiles_headless())
+    
     root = tk.Tk()
     
     # Set blue theme as default
@@ -920,6 +3244,11 @@ def main():
         app.camera_active = False
         if app.cap:
             app.cap.release()
+        app.photo_writer.close()
+        # Running renders stop at the next photo and resume from their checkpoint next time
+        app.render_scheduler.shutdown()
+        if app.batch_renderer:
+            app.batch_renderer.terminate()
         root.destroy()
     
     root.protocol("WM_DELETE_WINDOW", on_closing)